@@ -1,51 +1,67 @@
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-import mysql.connector
-import pandas as pd
-import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 from werkzeug.utils import secure_filename
-import joblib
 import os
 import uuid
 import csv
 import io
+import json
+import math
+import base64
 import re
-from dotenv import load_dotenv
+import time
 from config import get_config
+from scoring_utils import (
+    location_cache_stats, resolve_scoring_engine, score_clients_batch, scoring_version,
+    MODEL_FEATURE_COLUMNS, get_scoring_tables, reload_scoring_tables
+)
+from csv_utils import (
+    CSV_DOWNLOAD_FIELDNAMES, CSV_ENCODING, DUPLICATE_LEAD_MODES, MAX_JUMLAH_ULASAN, LeadDeduplicator,
+    iter_scored_chunks, ingest_csv_stream, lead_fingerprint, validate_csv_header
+)
+from db_utils import (
+    bulk_update_by_id, db_connection, iter_query_chunks, lock_is_free, named_lock, pool_stats
+)
+from job_utils import submit_job, get_job, latest_job
+from rescore_utils import (
+    count_stale_results, mark_uploads_current, rescore_client_results, rescore_csv_results
+)
+from model_utils import (
+    MODEL_REGISTRY, save_model_artifacts, read_current_version, list_model_versions,
+    rows_to_matrix, train_models_from_chunks
+)
+from metrics_utils import (
+    init_app as init_metrics, inc, record_stage, render_metrics, set_gauge, stage_timer,
+    thread_stage_seconds
+)
+from summary_utils import (
+    SCOPE_CLIENTS, SCOPE_CSV_UPLOAD, update_summary, delete_summary,
+    copy_summary, rebuild_summary, fetch_summary
+)
+from schema_utils import check_schema
 
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+# Get configuration (config.py sudah memanggil load_dotenv)
+config = get_config()
 
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": os.getenv("CORS_ORIGINS", "*")}})
+CORS(
+    app,
+    resources={r"/api/*": {"origins": os.getenv("CORS_ORIGINS", "*")}},
+    expose_headers=['X-Next-Cursor']
+)
+init_metrics(app)
 
-# Load environment variables
-load_dotenv()
+# Model (dan sklearn) hanya di-load saat start jika engine 'model' dipakai; load sebelum
+# fork (gunicorn --preload) supaya worker berbagi page copy-on-write (pohon RandomForest
+# tidak ikut mmap, lihat ModelRegistry)
+if config.MODEL_PRELOAD and config.SCORING_ENGINE == 'model' and MODEL_REGISTRY.available():
+    MODEL_REGISTRY.get()
 
-# Get configuration
-config = get_config()
+# Tabel scoring di-load (dan divalidasi) saat start, bukan di request pertama
+get_scoring_tables()
 
-app = Flask(__name__)
-CORS(app)
-
-# Database configuration using config
-db_config = {
-    'host': config.DB_HOST,
-    'port': config.DB_PORT,
-    'user': config.DB_USER,
-    'password': config.DB_PASSWORD,
-    'database': config.DB_NAME
-}
-
-# Model paths from config
-MODEL_PATH = config.MODEL_PATH
-SCALER_PATH = config.SCALER_PATH
-KMEANS_PATH = config.KMEANS_PATH
+# Gagal start kalau kolom/tabel baru belum dimigrasi (python schema_utils.py)
+check_schema()
 
 # Konfigurasi upload folder
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'csv_uploads')
@@ -55,355 +71,612 @@ ALLOWED_EXTENSIONS = {'csv'}
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = config.MAX_UPLOAD_MB * 1024 * 1024  # default 16MB, bisa dinaikkan lewat MAX_UPLOAD_MB
 
-def get_db_connection():
-    return mysql.connector.connect(**db_config)
+def get_scoring_engine():
+    """Engine scoring dari ?engine= (default SCORING_ENGINE); ValueError jika tidak bisa dipakai"""
+    engine = resolve_scoring_engine(request.args.get('engine'))
+    if engine == 'model' and not MODEL_REGISTRY.available():
+        raise ValueError('Model artifacts not found, train the models first')
+    return engine
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_features_from_data(client_data):
-    """Extract features from client data berdasarkan rating"""
-    features = {}
-    
-    nama = client_data['nama'] or ''
-    nomor = client_data['nomor_telepon'] or ''
-    kategori = client_data['kategori_usaha'].lower()
-    lokasi = client_data['lokasi'].lower()
-    rating = float(client_data.get('rating', 0))
-    jumlah_ulasan = int(client_data.get('jumlah_ulasan', 0))
-    
-    # 1. RATING (Weight: 35%)
-    features['rating'] = max(0, min(5, rating))  # Ensure 0-5 range
-    
-    # 2. JUMLAH ULASAN (Weight: 25%)
-    # Normalize: 0-1000 ulasan → 0-100 scale
-    features['jumlah_ulasan'] = min(jumlah_ulasan, 1000)  # Cap at 1000
-    
-    # 3. LOKASI-BASED FEATURES (Weight: 40% total)
-    # Predefined scoring dictionaries
-    location_scores = {
-        'jakarta': {'potensi': 9, 'kepadatan': 9, 'daya_beli': 8},
-        'surabaya': {'potensi': 8, 'kepadatan': 8, 'daya_beli': 7},
-        'bandung': {'potensi': 8, 'kepadatan': 8, 'daya_beli': 7},
-        'yogyakarta': {'potensi': 7, 'kepadatan': 7, 'daya_beli': 6},
-        'semarang': {'potensi': 7, 'kepadatan': 7, 'daya_beli': 6},
-        'medan': {'potensi': 7, 'kepadatan': 8, 'daya_beli': 6},
-        'denpasar': {'potensi': 7, 'kepadatan': 7, 'daya_beli': 7},
-        'makassar': {'potensi': 6, 'kepadatan': 7, 'daya_beli': 6},
-        'malang': {'potensi': 6, 'kepadatan': 6, 'daya_beli': 5},
-        'bogor': {'potensi': 6, 'kepadatan': 7, 'daya_beli': 6},
-        'tangerang': {'potensi': 6, 'kepadatan': 7, 'daya_beli': 6},
-        'bekasi': {'potensi': 6, 'kepadatan': 7, 'daya_beli': 6},
-        'depok': {'potensi': 5, 'kepadatan': 6, 'daya_beli': 5}
-    }
-    
-    keyword_scores = {
-        'mall': {'potensi': 9, 'kepadatan': 9, 'daya_beli': 9},
-        'pusat': {'potensi': 8, 'kepadatan': 8, 'daya_beli': 8},
-        'strategis': {'potensi': 8, 'kepadatan': 7, 'daya_beli': 8},
-        'utama': {'potensi': 8, 'kepadatan': 8, 'daya_beli': 8},
-        'perkantoran': {'potensi': 7, 'kepadatan': 6, 'daya_beli': 8},
-        'perumahan': {'potensi': 6, 'kepadatan': 7, 'daya_beli': 6},
-        'komersial': {'potensi': 8, 'kepadatan': 8, 'daya_beli': 7},
-        'desa': {'potensi': 4, 'kepadatan': 4, 'daya_beli': 3},
-        'kecil': {'potensi': 4, 'kepadatan': 4, 'daya_beli': 3},
-        'pinggiran': {'potensi': 4, 'kepadatan': 4, 'daya_beli': 3}
-    }
-    
-    # Initialize scores
-    potensi = 5
-    kepadatan = 5
-    daya_beli = 5
-    
-    # Check for city matches
-    for city, scores in location_scores.items():
-        if city in lokasi:
-            potensi = max(potensi, scores['potensi'])
-            kepadatan = max(kepadatan, scores['kepadatan'])
-            daya_beli = max(daya_beli, scores['daya_beli'])
-    
-    # Check for keyword matches
-    for keyword, scores in keyword_scores.items():
-        if keyword in lokasi:
-            potensi = max(potensi, scores['potensi'])
-            kepadatan = max(kepadatan, scores['kepadatan'])
-            daya_beli = max(daya_beli, scores['daya_beli'])
-    
-    # Special cases for high-end areas
-    if any(x in lokasi for x in ['selatan', 'pusat', 'menteng', 'pondok indah', 'kebayoran']):
-        daya_beli = max(daya_beli, 9)
-    
-    features['potensi_bisnis_lokasi'] = potensi
-    features['kepadatan_penduduk'] = kepadatan
-    features['daya_beli_lokasi'] = daya_beli
-    
-    # KATEGORI USAHA BONUS (Additional 0-10 points)
-    kategori_bonus = {
-        'teknologi': 8, 'technology': 8, 'it': 7, 'software': 8,
-        'kesehatan': 7, 'health': 7, 'medis': 7, 'klinik': 6,
-        'fashion': 6, 'clothing': 6, 'apparel': 6,
-        'makanan': 5, 'food': 5, 'restoran': 5, 'kuliner': 5,
-        'retail': 4, 'toko': 4, 'store': 4,
-        'jasa': 3, 'service': 3,
-        'otomotif': 4, 'automotive': 4,
-        'pendidikan': 6, 'education': 6, 'sekolah': 5,
-    }
-    
-    features['kategori_bonus'] = kategori_bonus.get(kategori, 0)
-    
-    return features
+CSV_RESULT_INSERT_SQL = """
+    INSERT INTO csv_analysis_results 
+    (upload_id, client_name, phone_number, email, website, business_category, location, 
+    rating, jumlah_ulasan, potential_score, segmentation, priority, recommendation_category,
+    lead_fingerprint, scoring_version)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
 
-def analyze_potential(features):
-    """Analyze client potential menggunakan weighted scoring system berdasarkan rating"""
-    # Weighting system
-    weights = {
-        'rating': 0.35,                   # 35% - Rating 0-5
-        'jumlah_ulasan': 0.25,            # 25% - Jumlah ulasan
-        'potensi_bisnis_lokasi': 0.15,    # 15% - Potensi lokasi
-        'kepadatan_penduduk': 0.10,       # 10% - Kepadatan
-        'daya_beli_lokasi': 0.15          # 15% - Daya beli
-    }
-    
-    # Normalize each feature to 0-100 scale
-    normalized_features = {}
-    
-    # Rating (0-5 → 0-100)
-    normalized_features['rating'] = (features['rating'] / 5) * 100
-    
-    # Jumlah ulasan (0-1000 → 0-100)
-    normalized_features['jumlah_ulasan'] = (features['jumlah_ulasan'] / 1000) * 100
-    
-    # Location features (already 0-10 scale → 0-100)
-    normalized_features['potensi_bisnis_lokasi'] = features['potensi_bisnis_lokasi'] * 10
-    normalized_features['kepadatan_penduduk'] = features['kepadatan_penduduk'] * 10
-    normalized_features['daya_beli_lokasi'] = features['daya_beli_lokasi'] * 10
-    
-    # Calculate weighted score
-    base_score = 0
-    for feature_name, weight in weights.items():
-        base_score += normalized_features[feature_name] * weight
-    
-    # Add kategori bonus (0-10 points)
-    base_score += features.get('kategori_bonus', 0)
-    
-    # Apply business rules adjustments
-    final_score = apply_business_rules(base_score, features)
-    
-    # Ensure score is within 0-100 range
-    final_score = max(0, min(100, final_score))
+class UploadSuperseded(RuntimeError):
+    """Proses upload ini sudah digantikan proses baru (process-csv-upload?force=1)"""
+
+def claim_upload(cursor, upload_id, token):
+    """Kunci baris csv_uploads di transaksi ini dan pastikan token proses masih milik job ini.
     
-    # Determine segmentation based on rating and business factors
-    segmentasi = determine_segmentation(final_score, features)
+    Reset force=1 mengubah baris yang sama, jadi chunk yang sedang di-commit
+    selesai dulu (lalu ikut terhapus) atau melihat token baru dan dibatalkan.
+    """
+    if token is None:
+        return
+    cursor.execute("SELECT processing_token FROM csv_uploads WHERE id = %s FOR UPDATE", (upload_id,))
+    row = cursor.fetchone()
+    current = (row['processing_token'] if isinstance(row, dict) else row[0]) if row else None
+    if current != token:
+        raise UploadSuperseded(f'Processing of upload {upload_id} was superseded by a newer run')
+
+def save_csv_results(conn, cursor, upload_id, values, processed_rows=0, version=None, token=None):
+    """Simpan hasil scoring CSV (tuple tanpa upload_id) per chunk CSV_INSERT_BATCH_SIZE.
     
-    # Determine priority
-    if final_score >= 80:
-        prioritas = "Tinggi"
-    elif final_score >= 60:
-        prioritas = "Sedang"
-    else:
-        prioritas = "Rendah"
+    Setiap baris di-stamp dengan versi scoring yang menghasilkannya. Jika token
+    diberikan, tiap chunk hanya di-commit selama token proses upload masih sama.
+    """
+    version = version or scoring_version()
+    values = [(upload_id,) + row_values + (version,) for row_values in values]
     
-    # Recommendation category
-    kategori_rekomendasi = get_recommendation_category(final_score, segmentasi, features)
+    saved_rows = 0
+    for start in range(0, len(values), config.CSV_INSERT_BATCH_SIZE):
+        chunk = values[start:start + config.CSV_INSERT_BATCH_SIZE]
+        saved_rows += insert_csv_results_chunk(conn, cursor, chunk, processed_rows + saved_rows, token)
     
-    return {
-        'skor_potensi': int(round(final_score)),
-        'segmentasi': segmentasi,
-        'prioritas': prioritas,
-        'kategori_rekomendasi': kategori_rekomendasi
-    }
+    return saved_rows
 
-def apply_business_rules(score, features):
-    """Apply business rules adjustments berdasarkan rating"""
-    adjusted_score = score
-    
-    # Bonus for high rating
-    if features['rating'] >= 4.5:  # Rating sangat tinggi
-        adjusted_score += 12
-    elif features['rating'] >= 4.0:  # Rating tinggi
-        adjusted_score += 8
-    elif features['rating'] >= 3.5:  # Rating baik
-        adjusted_score += 4
-    
-    # Bonus for many reviews (social proof)
-    if features['jumlah_ulasan'] > 500:  # Ulasan sangat banyak
-        adjusted_score += 10
-    elif features['jumlah_ulasan'] > 200:  # Ulasan banyak
-        adjusted_score += 6
-    elif features['jumlah_ulasan'] > 50:  # Ulasan cukup
-        adjusted_score += 3
-    
-    # Bonus for premium location
-    if features['potensi_bisnis_lokasi'] >= 80:  # High potential location
-        adjusted_score += 6
-    
-    # Bonus for high density area
-    if features['kepadatan_penduduk'] >= 80:  # High density
-        adjusted_score += 4
-    
-    # Bonus for high purchasing power
-    if features['daya_beli_lokasi'] >= 80:  # High purchasing power
-        adjusted_score += 5
-    
-    # Penalty for low rating
-    if features['rating'] < 2.0:  # Rating sangat rendah
-        adjusted_score -= 15
-    elif features['rating'] < 3.0:  # Rating rendah
-        adjusted_score -= 8
-    
-    # Penalty for very few reviews
-    if features['jumlah_ulasan'] < 10:  # Very few reviews
-        adjusted_score -= 5
-    
-    return min(100, adjusted_score)  # Cap at 100
-
-def determine_segmentation(score, features):
-    """Determine segmentation based on rating and business factors"""
-    # Base segmentation on score dengan pertimbangan rating
-    if score >= 85:
-        return "Premium - Rating Tinggi"
-    elif score >= 70:
-        if features['rating'] >= 4.0:
-            return "Expert - Berpengalaman & Terpercaya"
-        else:
-            return "Menengah - Berkembang"
-    elif score >= 50:
-        return "Standard - Potensi Berkembang"
-    else:
-        return "Pemula - Perlu Pembinaan"
-
-def get_recommendation_category(score, segment, features):
-    """Get personalized recommendation based on rating factors"""
-    recommendations = {
-        'Premium - Rating Tinggi': [
-            "Prioritas Utama - Program Exclusive",
-            "Partnership Premium - Kolaborasi Strategis",
-            "VIP Treatment - Layanan Prioritas"
-        ],
-        'Expert - Berpengalaman & Terpercaya': [
-            "Prioritas Menengah - Program Growth",
-            "Business Expansion - Pengembangan Jangkauan", 
-            "Loyalty Program - Program Loyalitas"
-        ],
-        'Menengah - Berkembang': [
-            "Prioritas Standard - Program Pengembangan",
-            "Quality Improvement - Peningkatan Kualitas",
-            "Marketing Support - Dukungan Pemasaran"
-        ],
-        'Standard - Potensi Berkembang': [
-            "Basic Support - Dukungan Dasar",
-            "Training Program - Program Pelatihan",
-            "Mentorship - Program Pendampingan"
-        ],
-        'Pemula - Perlu Pembinaan': [
-            "Starter Package - Paket Pemula",
-            "Foundation Building - Pembangunan Dasar",
-            "Basic Guidance - Panduan Dasar"
-        ]
-    }
+def insert_csv_results_chunk(conn, cursor, chunk, processed_rows=0, token=None):
+    """Insert satu chunk dengan executemany (multi-row VALUES) lalu commit.
     
-    # Select recommendation based on segment
-    segment_recommendations = recommendations.get(segment, [
-        "Custom Program - Program Khusus"
-    ])
+    Jika statement gagal, chunk diulang per baris supaya baris yang error
+    tetap dilewati satu per satu seperti sebelumnya.
+    """
+    if not chunk:
+        return 0
+    upload_id = chunk[0][0]
+    try:
+        claim_upload(cursor, upload_id, token)
+        cursor.executemany(CSV_RESULT_INSERT_SQL, chunk)
+        update_csv_summary(cursor, chunk)
+        conn.commit()
+        return len(chunk)
+    except UploadSuperseded:
+        conn.rollback()
+        raise
+    except Exception:
+        conn.rollback()
     
-    # Further customize based on rating characteristics
-    if features['rating'] >= 4.5:
-        return segment_recommendations[0] + " (Rating Excellent)"
-    elif features['rating'] >= 4.0:
-        return segment_recommendations[0] + " (Rating Very Good)"
-    else:
-        return segment_recommendations[0]
+    claim_upload(cursor, upload_id, token)
+    saved = []
+    for row_values in chunk:
+        try:
+            cursor.execute(CSV_RESULT_INSERT_SQL, row_values)
+            saved.append(row_values)
+        except Exception as e:
+            print(f"Error processing row {processed_rows + len(saved) + 1}: {str(e)}")
+            continue
+    update_csv_summary(cursor, saved)
+    conn.commit()
+    return len(saved)
+
+def find_known_leads(cursor, fingerprints, exclude_upload_ids=()):
+    """Fingerprint yang sudah ada di csv_analysis_results (lookup lewat index lead_fingerprint)"""
+    fingerprints = list(fingerprints)
+    exclude_upload_ids = list(exclude_upload_ids)
+    exclude_sql = ''
+    if exclude_upload_ids:
+        exclude_sql = f" AND upload_id NOT IN ({', '.join(['%s'] * len(exclude_upload_ids))})"
+    known = set()
+    for start in range(0, len(fingerprints), config.CSV_INSERT_BATCH_SIZE):
+        chunk = fingerprints[start:start + config.CSV_INSERT_BATCH_SIZE]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cursor.execute(
+            f"SELECT DISTINCT lead_fingerprint FROM csv_analysis_results "
+            f"WHERE lead_fingerprint IN ({placeholders}){exclude_sql}",
+            chunk + exclude_upload_ids
+        )
+        for row in cursor.fetchall():
+            known.add(row['lead_fingerprint'] if isinstance(row, dict) else row[0])
+    return known
+
+def same_content_uploads(cursor, upload_id):
+    """Id upload dengan isi file identik (termasuk upload itu sendiri)"""
+    cursor.execute("""
+        SELECT o.id FROM csv_uploads u
+        JOIN csv_uploads o ON o.content_hash = u.content_hash
+        WHERE u.id = %s
+    """, (upload_id,))
+    ids = {row['id'] if isinstance(row, dict) else row[0] for row in cursor.fetchall()}
+    ids.add(upload_id)
+    return sorted(ids)
+
+def new_lead_deduplicator(cursor, upload_id=None):
+    """LeadDeduplicator untuk satu upload, atau None jika DUPLICATE_LEADS=keep.
+
+    Lead milik upload dengan isi file identik tidak dihitung sebagai duplikat,
+    supaya upload ulang file yang sama (mis. setelah versi scoring naik) tetap
+    menghasilkan barisnya sendiri.
+    """
+    if config.DUPLICATE_LEADS not in DUPLICATE_LEAD_MODES:
+        raise ValueError(f"Unknown DUPLICATE_LEADS mode '{config.DUPLICATE_LEADS}', use one of: {', '.join(DUPLICATE_LEAD_MODES)}")
+    if config.DUPLICATE_LEADS != 'skip':
+        return None
+    exclude_upload_ids = same_content_uploads(cursor, upload_id) if upload_id is not None else ()
+    return LeadDeduplicator(lambda fingerprints: find_known_leads(cursor, fingerprints, exclude_upload_ids))
+
+def update_csv_summary(cursor, chunk):
+    """Update ringkasan upload di transaksi yang sama dengan insert hasilnya"""
+    if chunk:
+        # Kolom (upload_id, ..., potential_score, segmentation, priority, ...)
+        update_summary(cursor, SCOPE_CSV_UPLOAD, chunk[0][0],
+                       ((row[9], row[11], row[10]) for row in chunk))
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Endpoint untuk mengecek status server"""
     try:
-        conn = get_db_connection()
-        conn.close()
+        with db_connection() as conn:
+            conn.ping(reconnect=True)
         return jsonify({
             'status': 'healthy',
             'database': 'connected',
-            'models_loaded': os.path.exists(MODEL_PATH) and 
-                            os.path.exists(SCALER_PATH) and 
-                            os.path.exists(KMEANS_PATH)
+            'models_loaded': MODEL_REGISTRY.available(),
+            'model_registry': MODEL_REGISTRY.stats(),
+            'location_cache': location_cache_stats(),
+            'scoring_tables': get_scoring_tables().stats(),
+            'db_pool': pool_stats()
         })
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
             'database': 'disconnected',
-            'error': str(e)
+            'error': str(e),
+            'db_pool': pool_stats()
         }), 500
 
+RETRAIN_QUERY = """
+    SELECT f.frekuensi_transaksi, f.nilai_transaksi_rata_rata, 
+           f.lama_usaha_bulan, f.luas_area_usaha, 
+           f.potensi_bisnis_lokasi, f.kepadatan_penduduk, 
+           f.daya_beli_lokasi, a.skor_potensi
+    FROM features f
+    JOIN analysis_results a ON f.client_id = a.client_id
+    WHERE a.skor_potensi IS NOT NULL
+"""
+
+def running_job_conflict(job_type, message):
+    """Response 409 jika job tipe ini masih jalan di worker ini atau (lewat lock DB) di worker lain"""
+    active_job = latest_job(job_type)
+    if active_job and active_job['status'] in ('queued', 'running'):
+        return jsonify({'error': message, 'job_id': active_job['job_id']}), 409
+    if not lock_is_free(job_type):
+        return jsonify({'error': message, 'job_id': None}), 409
+    return None
+
+def run_locked(lock_name, func, *args):
+    """Jalankan job di bawah named_lock supaya hanya satu yang jalan di semua worker gunicorn"""
+    with named_lock(lock_name):
+        return func(*args)
+
 @app.route('/api/retrain', methods=['POST'])
 def retrain_models():
-    """Endpoint untuk melatih ulang model dengan data terbaru"""
+    """Endpoint untuk melatih ulang model dengan data terbaru (dijalankan sebagai background job)"""
     try:
-        # Ambil data dari database untuk training
-        conn = get_db_connection()
-        query = """
-            SELECT f.frekuensi_transaksi, f.nilai_transaksi_rata_rata, 
-                   f.lama_usaha_bulan, f.luas_area_usaha, 
-                   f.potensi_bisnis_lokasi, f.kepadatan_penduduk, 
-                   f.daya_beli_lokasi, a.skor_potensi
-            FROM features f
-            JOIN analysis_results a ON f.client_id = a.client_id
-            WHERE a.skor_potensi IS NOT NULL
-        """
-        df = pd.read_sql(query, conn)
-        conn.close()
+        conflict = running_job_conflict('retrain', 'Retraining is already running')
+        if conflict:
+            return conflict
         
-        if len(df) < config.MIN_SAMPLE_SIZE:
+        # Cek jumlah data dulu supaya request yang pasti gagal langsung dijawab
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT COUNT(*) FROM ({RETRAIN_QUERY}) AS training_data")
+            available_samples = cursor.fetchone()[0]
+            cursor.close()
+        
+        if available_samples < config.MIN_SAMPLE_SIZE:
             return jsonify({
                 'error': f'Not enough data for training. Minimum {config.MIN_SAMPLE_SIZE} samples required.',
-                'available_samples': len(df)
+                'available_samples': available_samples
             }), 400
         
-        # Prepare data for training
-        X = df.drop('skor_potensi', axis=1).values
-        y = df['skor_potensi'].values / 100.0  # Convert to 0-1 scale
+        job_id = submit_job(run_locked, 'retrain', run_retraining, available_samples, job_type='retrain')
+        
+        return jsonify({
+            'message': 'Model retraining started',
+            'job_id': job_id,
+            'available_samples': available_samples
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def run_retraining(expected_rows=None):
+    """Latih ulang model dari database dan simpan sebagai versi artifact baru (background job).
+    
+    Data training di-stream per TRAINING_CHUNK_SIZE baris, tidak pernah dimuat utuh.
+    """
+    started = time.perf_counter()
+    
+    def open_chunks():
+        with db_connection() as conn:
+            for rows in iter_query_chunks(conn, RETRAIN_QUERY, chunk_size=config.TRAINING_CHUNK_SIZE):
+                yield rows_to_matrix(rows)
+    
+    # Kolom terakhir query adalah target skor_potensi (skala 0-100)
+    model, scaler, kmeans, info = train_models_from_chunks(
+        open_chunks, len(MODEL_FEATURE_COLUMNS) + 1, config.TRAINING_MAX_ROWS, expected_rows
+    )
+    fit_seconds = time.perf_counter() - started
+    
+    if info['rows_seen'] < config.MIN_SAMPLE_SIZE:
+        raise ValueError(f'Not enough data for training. Minimum {config.MIN_SAMPLE_SIZE} samples required.')
+    
+    # Simpan sebagai versi baru lalu pindahkan pointer CURRENT
+    save_started = time.perf_counter()
+    version = save_model_artifacts(model, scaler, kmeans, info)
+    MODEL_REGISTRY.get()
+    
+    return dict(info, model_version=version, timings={
+        'load_fit_seconds': round(fit_seconds, 3),
+        'save_seconds': round(time.perf_counter() - save_started, 3),
+        'total_seconds': round(time.perf_counter() - started, 3)
+    })
+
+@app.route('/api/rescore', methods=['POST'])
+def rescore_results():
+    """Score ulang hasil yang scoring_version-nya usang (dijalankan sebagai background job)"""
+    try:
+        try:
+            engine = get_scoring_engine()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        conflict = running_job_conflict('rescore', 'Rescoring is already running')
+        if conflict:
+            return conflict
+        
+        version = scoring_version(engine)
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            stale = count_stale_results(cursor, version)
+            cursor.close()
+        
+        if not any(stale.values()):
+            return jsonify({
+                'message': 'All results are already scored with the current version',
+                'scoring_version': version,
+                'stale_rows': stale
+            })
         
-        # Train new models
-        scaler = StandardScaler()
-        X_scaled = scaler.fit_transform(X)
+        job_id = submit_job(run_locked, 'rescore', run_rescoring, engine, version, job_type='rescore',
+                            meta={'scoring_version': version})
         
-        model = RandomForestRegressor(n_estimators=100, random_state=42)
-        model.fit(X_scaled, y)
+        return jsonify({
+            'message': 'Rescoring started',
+            'job_id': job_id,
+            'scoring_version': version,
+            'stale_rows': stale
+        }), 202
         
-        kmeans = KMeans(n_clusters=4, random_state=42)
-        kmeans.fit(X_scaled)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def run_rescoring(engine, version):
+    """Score ulang baris usang dari input yang tersimpan di database, per RESCORE_BATCH_SIZE.
+    
+    Tiap batch di-commit sendiri dan hanya baris dengan versi lain yang dibaca,
+    jadi job bisa dijalankan ulang dengan aman setelah gagal di tengah jalan.
+    """
+    started = time.perf_counter()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        client_rows = rescore_client_results(conn, cursor, version, engine)
+        csv_rows, upload_ids = rescore_csv_results(conn, cursor, version, engine)
+        mark_uploads_current(conn, cursor, upload_ids, version)
+        cursor.close()
+    
+    seconds = time.perf_counter() - started
+    return {
+        'scoring_version': version,
+        'client_rows': client_rows,
+        'csv_rows': csv_rows,
+        'uploads': len(upload_ids),
+        'seconds': round(seconds, 3)
+    }
+
+@app.route('/api/leads/backfill-fingerprints', methods=['POST'])
+def backfill_lead_fingerprints():
+    """Isi lead_fingerprint untuk hasil CSV lama supaya ikut dipakai deteksi duplikat"""
+    try:
+        conflict = running_job_conflict('lead-fingerprints', 'Fingerprint backfill is already running')
+        if conflict:
+            return conflict
+        
+        job_id = submit_job(run_locked, 'lead-fingerprints', run_fingerprint_backfill,
+                            job_type='lead-fingerprints')
+        return jsonify({'message': 'Fingerprint backfill started', 'job_id': job_id}), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def run_fingerprint_backfill():
+    """Hitung fingerprint baris tanpa lead_fingerprint per batch (keyset id), satu commit per batch"""
+    started = time.perf_counter()
+    updated_rows = 0
+    last_id = 0
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        while True:
+            cursor.execute(
+                "SELECT id, client_name, phone_number, location FROM csv_analysis_results "
+                "WHERE id > %s AND lead_fingerprint IS NULL ORDER BY id LIMIT %s",
+                (last_id, config.RESCORE_BATCH_SIZE)
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            # UPDATE ... JOIN: baris yang terhapus di tengah backfill tidak dibuat ulang
+            bulk_update_by_id(
+                cursor, 'csv_analysis_results', ('lead_fingerprint',),
+                [(row[0], lead_fingerprint(row[1], row[2], row[3])) for row in rows]
+            )
+            conn.commit()
+            updated_rows += len(rows)
+            last_id = rows[-1][0]
+        cursor.close()
+    
+    return {'updated_rows': updated_rows, 'seconds': round(time.perf_counter() - started, 3)}
+
+@app.route('/api/rescore/status', methods=['GET'])
+def get_rescore_status():
+    """Versi scoring aktif, jumlah baris usang dan job rescoring terakhir (di worker ini)"""
+    try:
+        try:
+            version = scoring_version(get_scoring_engine())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Save models
-        joblib.dump(model, MODEL_PATH)
-        joblib.dump(scaler, SCALER_PATH)
-        joblib.dump(kmeans, KMEANS_PATH)
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            stale = count_stale_results(cursor, version)
+            cursor.close()
         
         return jsonify({
-            'message': 'Models retrained successfully',
-            'samples_used': len(df),
-            'model_score': model.score(X_scaled, y)
+            'scoring_version': version,
+            'stale_rows': stale,
+            'job': latest_job('rescore')
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/scoring-tables', methods=['GET'])
+def get_scoring_tables_info():
+    """Versi dan ukuran tabel scoring yang aktif di worker ini"""
+    return jsonify(get_scoring_tables().stats())
+
+@app.route('/api/scoring-tables/reload', methods=['POST'])
+def reload_scoring_tables_endpoint():
+    """Paksa load ulang file tabel scoring di worker ini.
+    
+    Worker lain mengikuti lewat cek mtime (SCORING_TABLES_CHECK_SECONDS).
+    Hasil lama tidak berubah; jalankan /api/rescore jika versinya berubah.
+    """
+    try:
+        tables, previous = reload_scoring_tables(force=True)
+    except Exception as e:
+        return jsonify({
+            'error': f'Failed to load scoring tables: {str(e)}',
+            'version': get_scoring_tables().version
+        }), 400
+    
+    return jsonify(dict(
+        tables.stats(),
+        message='Scoring tables reloaded',
+        previous_version=previous.version,
+        changed=tables.version != previous.version
+    ))
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Metrics format Prometheus untuk worker yang menjawab request ini"""
+    db_pool = pool_stats()
+    location_cache = location_cache_stats()
+    model_registry = MODEL_REGISTRY.stats()
+    body = render_metrics({
+        'db_pool_connections': ('Status koneksi pool database', {
+            (('state', name),): db_pool[name] for name in ('in_use', 'pool_size')
+        }),
+        'db_pool_events_total': ('Event pool database sejak worker start', {
+            (('event', name),): db_pool[name] for name in ('checkouts', 'waits', 'timeouts', 'errors')
+        }, 'counter'),
+        'location_cache_entries': ('Isi cache lokasi', {
+            (('kind', name),): location_cache[name] for name in ('size', 'max_size')
+        }),
+        'location_cache_lookups_total': ('Lookup cache lokasi sejak worker start', {
+            (('result', 'hit'),): location_cache['hits'],
+            (('result', 'miss'),): location_cache['misses']
+        }, 'counter'),
+        'location_cache_hit_rate': ('Hit rate cache lokasi', location_cache['hit_rate']),
+        'model_registry_loads_total': ('Jumlah load model di worker ini', model_registry['loads'], 'counter'),
+        'model_registry_load_seconds': ('Durasi load model terakhir', model_registry.get('load_seconds'))
+    })
+    return Response(body, mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/retrain/status', methods=['GET'])
+def get_retrain_status():
+    """Status retraining terakhir (di worker ini) dan versi model yang aktif"""
+    return jsonify({
+        'job': latest_job('retrain'),
+        'current_version': read_current_version(),
+        'versions': list_model_versions(),
+        'model_registry': MODEL_REGISTRY.stats()
+    })
+
+def get_page_limit():
+    """Ukuran halaman dari ?limit=, dibatasi PAGE_SIZE_MAX"""
+    try:
+        limit = int(request.args.get('limit', config.PAGE_SIZE_DEFAULT))
+    except ValueError:
+        limit = config.PAGE_SIZE_DEFAULT
+    return max(1, min(limit, config.PAGE_SIZE_MAX))
+
+def encode_cursor(values):
+    """Cursor keyset opaque (base64 JSON) dari nilai kolom sort baris terakhir"""
+    payload = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor_value, size):
+    """Decode cursor dari request; raise ValueError jika tidak valid"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor_value.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    return values
+
+def get_result_filters(columns):
+    """Bangun klausa WHERE dari filter ?prioritas=&segmentasi=&kategori=&min_score=&q="""
+    conditions = []
+    params = []
+    
+    # Pencarian nama (substring, case-insensitive lewat collation kolom)
+    query = (request.args.get('q') or '').strip()
+    if query:
+        escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions.append(f"{columns['nama']} LIKE %s")
+        params.append(f"%{escaped}%")
+    
+    for arg, column in (('prioritas', columns['prioritas']),
+                        ('segmentasi', columns['segmentasi']),
+                        ('kategori', columns['kategori'])):
+        value = request.args.get(arg)
+        if value:
+            conditions.append(f"{column} = %s")
+            params.append(value)
+    
+    min_score = request.args.get('min_score')
+    if min_score not in (None, ''):
+        conditions.append(f"{columns['score']} >= %s")
+        params.append(int(min_score))
+    
+    return conditions, params
+
 @app.route('/api/clients', methods=['GET'])
 def get_clients():
-    """Get all clients"""
+    """Get clients dengan keyset pagination (?limit=&cursor=), filter dan sort
+    
+    Body tetap berupa array; cursor halaman berikutnya ada di header X-Next-Cursor.
+    """
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM clients ORDER BY created_at DESC")
-        clients = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify(clients)
+        limit = get_page_limit()
+        sort = request.args.get('sort', 'newest')
+        if sort not in ('newest', 'score'):
+            return jsonify({'error': "sort must be 'newest' or 'score'"}), 400
+        
+        conditions, params = get_result_filters({
+            'nama': 'c.nama',
+            'prioritas': 'a.prioritas',
+            'segmentasi': 'a.segmentasi',
+            'kategori': 'c.kategori_usaha',
+            'score': 'a.skor_potensi'
+        })
+        
+        sort_column = 'c.created_at' if sort == 'newest' else 'a.skor_potensi'
+        if sort == 'score':
+            # Klien tanpa hasil analisis tidak punya posisi di urutan skor
+            conditions.append("a.skor_potensi IS NOT NULL")
+        cursor_value = request.args.get('cursor')
+        if cursor_value:
+            last_value, last_id = decode_cursor(cursor_value, 2)
+            conditions.append(f"({sort_column} < %s OR ({sort_column} = %s AND c.id < %s))")
+            params.extend([last_value, last_value, last_id])
+        
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        query = f"""
+            SELECT c.*, a.skor_potensi, a.segmentasi, a.prioritas, a.kategori_rekomendasi
+            FROM clients c
+            LEFT JOIN analysis_results a ON a.client_id = c.id
+            {where}
+            ORDER BY {sort_column} DESC, c.id DESC
+            LIMIT %s
+        """
+        
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(query, params + [limit + 1])
+            clients = cursor.fetchall()
+            cursor.close()
+        
+        response = jsonify(clients[:limit])
+        if len(clients) > limit:
+            last = clients[limit - 1]
+            sort_key = 'created_at' if sort == 'newest' else 'skor_potensi'
+            response.headers['X-Next-Cursor'] = encode_cursor([last[sort_key], last['id']])
+        return response
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+CLIENT_INSERT_SQL = """
+    INSERT INTO clients (nama, nomor_telepon, kategori_usaha, lokasi, rating, jumlah_ulasan)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+FEATURES_INSERT_SQL = """
+    INSERT INTO features 
+    (client_id, rating, jumlah_ulasan, potensi_bisnis_lokasi, kepadatan_penduduk, daya_beli_lokasi)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+ANALYSIS_INSERT_SQL = """
+    INSERT INTO analysis_results 
+    (client_id, skor_potensi, segmentasi, prioritas, kategori_rekomendasi, scoring_version)
+    VALUES (%s, %s, %s, %s, %s, %s)
+"""
+
+CLIENT_FIELD_LENGTHS = {'nama': 255, 'nomor_telepon': 20, 'kategori_usaha': 100, 'lokasi': 255}
+
+def parse_client_payload(data):
+    """Validasi satu payload klien; raise ValueError dengan pesan untuk user jika tidak valid"""
+    if not isinstance(data, dict) or not data:
+        raise ValueError('No data provided')
+    
+    try:
+        rating = float(data.get('rating', 0))
+        jumlah_ulasan = int(data.get('jumlah_ulasan', 0))
+    except (TypeError, ValueError, OverflowError):
+        # JSON NaN/Infinity untuk jumlah_ulasan juga gagal di int()
+        raise ValueError('Rating and jumlah ulasan must be numeric')
+    
+    # Validate rating (NaN/Infinity dari JSON lolos float())
+    if not math.isfinite(rating) or rating < 0 or rating > 5:
+        raise ValueError('Rating must be between 0-5')
+    
+    # Validate jumlah_ulasan
+    if jumlah_ulasan < 0:
+        raise ValueError('Jumlah ulasan cannot be negative')
+    if jumlah_ulasan > MAX_JUMLAH_ULASAN:
+        raise ValueError(f'Jumlah ulasan must be at most {MAX_JUMLAH_ULASAN}')
+    
+    client_data = {
+        'nama': str(data.get('nama') or ''),
+        'nomor_telepon': str(data.get('nomor_telepon') or ''),
+        'kategori_usaha': str(data.get('kategori_usaha') or ''),
+        'lokasi': str(data.get('lokasi') or ''),
+        'rating': rating,
+        'jumlah_ulasan': jumlah_ulasan
+    }
+    
+    # Panjang kolom VARCHAR tabel clients; nilai lebih panjang menggagalkan seluruh batch insert
+    for field, max_length in CLIENT_FIELD_LENGTHS.items():
+        if len(client_data[field]) > max_length:
+            raise ValueError(f'{field} must be at most {max_length} characters')
+    
+    return client_data
+
 @app.route('/api/clients', methods=['POST'])
 def add_client():
     """Add a new client dengan rating"""
@@ -412,72 +685,29 @@ def add_client():
         if not data:
             return jsonify({'error': 'No data provided'}), 400
         
-        client_data = {
-            'nama': data.get('nama', ''),
-            'nomor_telepon': data.get('nomor_telepon', ''),
-            'kategori_usaha': data.get('kategori_usaha', ''),
-            'lokasi': data.get('lokasi', ''),
-            'rating': float(data.get('rating', 0)),
-            'jumlah_ulasan': int(data.get('jumlah_ulasan', 0))
-        }
-        
-        # Validate rating
-        if client_data['rating'] < 0 or client_data['rating'] > 5:
-            return jsonify({'error': 'Rating must be between 0-5'}), 400
-        
-        # Validate jumlah_ulasan
-        if client_data['jumlah_ulasan'] < 0:
-            return jsonify({'error': 'Jumlah ulasan cannot be negative'}), 400
+        try:
+            engine = get_scoring_engine()
+            client_data = parse_client_payload(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Extract features and analyze
-        features = extract_features_from_data(client_data)
-        analysis_result = analyze_potential(features)
+        # Score dengan engine yang sama seperti bulk import / CSV
+        with stage_timer('compute'):
+            scored = score_clients_batch([client_data], engine)
+        result = scored.iloc[0]
+        analysis_result = {
+            'skor_potensi': int(result['skor_potensi']),
+            'segmentasi': result['segmentasi'],
+            'prioritas': result['prioritas'],
+            'kategori_rekomendasi': result['kategori_rekomendasi']
+        }
         
         # Save to database
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Insert client
-        cursor.execute(
-            "INSERT INTO clients (nama, nomor_telepon, kategori_usaha, lokasi, rating, jumlah_ulasan) VALUES (%s, %s, %s, %s, %s, %s)",
-            (
-                client_data['nama'],
-                client_data['nomor_telepon'],
-                client_data['kategori_usaha'],
-                client_data['lokasi'],
-                client_data['rating'],
-                client_data['jumlah_ulasan']
-            )
-        )
-        client_id = cursor.lastrowid
-        
-        # Insert features
-        cursor.execute("""
-            INSERT INTO features 
-            (client_id, rating, jumlah_ulasan, potensi_bisnis_lokasi, kepadatan_penduduk, daya_beli_lokasi)
-            VALUES (%s, %s, %s, %s, %s, %s)
-        """, (
-            client_id, 
-            features['rating'], 
-            features['jumlah_ulasan'],
-            features['potensi_bisnis_lokasi'], 
-            features['kepadatan_penduduk'], 
-            features['daya_beli_lokasi']
-        ))
-        
-        # Insert analysis result
-        cursor.execute("""
-            INSERT INTO analysis_results 
-            (client_id, skor_potensi, segmentasi, prioritas, kategori_rekomendasi)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (
-            client_id, analysis_result['skor_potensi'], analysis_result['segmentasi'],
-            analysis_result['prioritas'], analysis_result['kategori_rekomendasi']
-        ))
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            client_id = insert_clients_batch(cursor, [client_data], scored, scoring_version(engine))[0]
+            conn.commit()
+            cursor.close()
         
         return jsonify({
             'message': 'Client added successfully',
@@ -487,6 +717,180 @@ def add_client():
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+@app.route('/api/clients/bulk', methods=['POST'])
+def add_clients_bulk():
+    """Tambah banyak klien sekaligus dari JSON array atau NDJSON (satu klien per baris).
+    
+    Item yang valid di-score per BULK_INSERT_BATCH_SIZE dan disimpan ke clients,
+    features dan analysis_results dengan executemany dalam satu transaksi.
+    Hasil per item berisi client_id atau pesan error validasi.
+    """
+    try:
+        try:
+            engine = get_scoring_engine()
+            items = iter_bulk_items()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        started = time.perf_counter()
+        version = scoring_version(engine)
+        results = []
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT @@auto_increment_increment")
+            id_step = int(cursor.fetchone()[0])
+            
+            for batch in iter_batches(items, config.BULK_INSERT_BATCH_SIZE):
+                indexes, clients = [], []
+                for index, payload in batch:
+                    try:
+                        if isinstance(payload, Exception):
+                            raise payload
+                        clients.append(parse_client_payload(payload))
+                        indexes.append(index)
+                    except ValueError as e:
+                        results.append({'index': index, 'error': str(e)})
+                if not clients:
+                    continue
+                
+                with stage_timer('compute'):
+                    scored = score_clients_batch(clients, engine)
+                client_ids = insert_clients_batch(cursor, clients, scored, version, id_step)
+                
+                for index, client_id, skor, segmentasi, prioritas in zip(
+                        indexes, client_ids, scored['skor_potensi'].tolist(),
+                        scored['segmentasi'], scored['prioritas']):
+                    results.append({
+                        'index': index,
+                        'client_id': client_id,
+                        'skor_potensi': skor,
+                        'segmentasi': segmentasi,
+                        'prioritas': prioritas
+                    })
+            
+            conn.commit()
+            cursor.close()
+        
+        seconds = time.perf_counter() - started
+        inserted = sum(1 for result in results if 'client_id' in result)
+        inc('clients_ingested_total', inserted)
+        results.sort(key=lambda result: result['index'])
+        
+        return jsonify({
+            'message': 'Bulk client import finished',
+            'inserted': inserted,
+            'failed': len(results) - inserted,
+            'seconds': round(seconds, 3),
+            'rows_per_sec': round(inserted / seconds, 1) if seconds > 0 else None,
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def iter_bulk_items():
+    """(index, payload) dari body request; payload berupa Exception jika baris NDJSON tidak valid"""
+    if request.mimetype in NDJSON_MIMETYPES:
+        return iter_ndjson_items(io.TextIOWrapper(request.stream, encoding='utf-8'))
+    
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('clients')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of clients or an NDJSON body')
+    return enumerate(data)
+
+def iter_ndjson_items(lines):
+    index = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            payload = ValueError(f'Invalid JSON: {str(e)}')
+        yield index, payload
+        index += 1
+
+def iter_batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def insert_clients_batch(cursor, clients, scored, version, id_step=1):
+    """Insert satu batch ke clients, features dan analysis_results (tanpa commit).
+    
+    executemany untuk INSERT dikirim sebagai satu statement multi-row, jadi id
+    auto-increment-nya berurutan mulai dari lastrowid dengan jarak id_step
+    (@@auto_increment_increment).
+    """
+    cursor.executemany(CLIENT_INSERT_SQL, [
+        (client['nama'], client['nomor_telepon'], client['kategori_usaha'],
+         client['lokasi'], client['rating'], client['jumlah_ulasan'])
+        for client in clients
+    ])
+    first_id = cursor.lastrowid
+    client_ids = [first_id + i * id_step for i in range(len(clients))]
+    
+    cursor.executemany(FEATURES_INSERT_SQL, list(zip(
+        client_ids, scored['rating'].tolist(), scored['jumlah_ulasan'].tolist(),
+        scored['potensi_bisnis_lokasi'].tolist(), scored['kepadatan_penduduk'].tolist(),
+        scored['daya_beli_lokasi'].tolist()
+    )))
+    cursor.executemany(ANALYSIS_INSERT_SQL, [
+        row + (version,) for row in zip(
+            client_ids, scored['skor_potensi'].tolist(), scored['segmentasi'].tolist(),
+            scored['prioritas'].tolist(), scored['kategori_rekomendasi'].tolist()
+        )
+    ])
+    update_summary(cursor, SCOPE_CLIENTS, 0, zip(
+        scored['skor_potensi'].tolist(), scored['prioritas'].tolist(), scored['segmentasi'].tolist()
+    ))
+    return client_ids
+
+@app.route('/api/analysis', methods=['GET'])
+def get_analysis_summary():
+    """Ringkasan analisis klien dari tabel agregat (tanpa scan analysis_results)"""
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            summary = fetch_summary(cursor, SCOPE_CLIENTS)
+            cursor.close()
+        
+        return jsonify(summary)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analysis/rebuild', methods=['POST'])
+def rebuild_analysis_summary():
+    """Hitung ulang tabel agregat dari data hasil (untuk data lama sebelum tabel agregat ada)"""
+    try:
+        upload_id = request.args.get('upload_id', type=int)
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            if upload_id is not None:
+                rebuild_summary(cursor, SCOPE_CSV_UPLOAD, upload_id)
+            else:
+                rebuild_summary(cursor, SCOPE_CLIENTS)
+                cursor.execute("SELECT id FROM csv_uploads")
+                for (csv_upload_id,) in cursor.fetchall():
+                    rebuild_summary(cursor, SCOPE_CSV_UPLOAD, csv_upload_id)
+            conn.commit()
+            cursor.close()
+        
+        return jsonify({'message': 'Analysis summary rebuilt successfully'})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
     
 # CSV Upload 
 
@@ -501,199 +905,485 @@ def upload_clients_csv():
         if file.filename == '':
             return jsonify({'error': 'No selected file'}), 400
         
+        try:
+            engine = get_scoring_engine()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         if file and allowed_file(file.filename):
             # Generate unique filename
             original_filename = secure_filename(file.filename)
             unique_filename = f"{uuid.uuid4().hex}_{original_filename}"
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-            file.save(filepath)
             
-            # Count rows in CSV
-            row_count = 0
+            # Opsional: score langsung saat file di-stream (?process=1)
+            if request.args.get('process', '').lower() in ('1', 'true'):
+                try:
+                    result = ingest_and_process_csv(file.stream, filepath, unique_filename, original_filename, engine)
+                except (ValueError, UnicodeDecodeError, csv.Error) as e:
+                    if os.path.exists(filepath):
+                        os.remove(filepath)
+                    return jsonify({'error': f'Invalid CSV file: {str(e)}'}), 400
+                
+                return jsonify({
+                    'message': 'File uploaded and processed successfully',
+                    'original_name': original_filename,
+                    **result
+                })
+            
+            # Simpan file sambil validasi header, hitung baris dan hash isi (satu pass)
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    reader = csv.reader(f)
-                    # Skip header and count rows
-                    next(reader, None)  # Skip header
-                    row_count = sum(1 for row in reader)
+                row_count, content_hash = ingest_csv_stream(file.stream, filepath)
             except Exception as e:
-                os.remove(filepath)
+                if os.path.exists(filepath):
+                    os.remove(filepath)
                 return jsonify({'error': f'Invalid CSV file: {str(e)}'}), 400
             
             # Save to database
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO csv_uploads (filename, original_name, total_rows) VALUES (%s, %s, %s)",
-                (unique_filename, original_filename, row_count)
-            )
-            upload_id = cursor.lastrowid
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with db_connection() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                # File identik yang sudah pernah diupload: pakai ulang file dan hasilnya
+                duplicate = find_duplicate_upload(cursor, content_hash)
+                if duplicate:
+                    os.remove(filepath)
+                    unique_filename = duplicate['filename']
+                
+                cursor.execute(
+                    "INSERT INTO csv_uploads (filename, original_name, total_rows, content_hash) VALUES (%s, %s, %s, %s)",
+                    (unique_filename, original_filename, row_count, content_hash)
+                )
+                upload_id = cursor.lastrowid
+                
+                reused_rows = None
+                if duplicate and duplicate['status'] == 'completed' and duplicate['scoring_version'] == scoring_version(engine):
+                    reused_rows = clone_csv_results(cursor, duplicate['id'], upload_id, duplicate['scoring_version'])
+                
+                conn.commit()
+                cursor.close()
             
-            return jsonify({
+            response = {
                 'message': 'File uploaded successfully',
                 'upload_id': upload_id,
                 'original_name': original_filename,
                 'total_rows': row_count
-            })
+            }
+            if duplicate:
+                response['duplicate_of'] = duplicate['id']
+                response['reused_results'] = reused_rows is not None
+                if reused_rows is not None:
+                    response['processed_rows'] = reused_rows
+            return jsonify(response)
         
         return jsonify({'error': 'Invalid file type'}), 400
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def find_duplicate_upload(cursor, content_hash):
+    """Cari upload lama dengan isi file identik yang file-nya masih ada"""
+    cursor.execute(
+        "SELECT id, filename, status, scoring_version FROM csv_uploads "
+        "WHERE content_hash = %s ORDER BY (status = 'completed') DESC, id DESC",
+        (content_hash,)
+    )
+    for candidate in cursor.fetchall():
+        if os.path.exists(os.path.join(app.config['UPLOAD_FOLDER'], candidate['filename'])):
+            return candidate
+    return None
+
+def clone_csv_results(cursor, source_upload_id, upload_id, version):
+    """Salin hasil analisis upload lama ke upload baru di sisi server (tanpa scoring ulang)"""
+    cursor.execute("""
+        INSERT INTO csv_analysis_results 
+        (upload_id, client_name, phone_number, email, website, business_category, location, 
+        rating, jumlah_ulasan, potential_score, segmentation, priority, recommendation_category,
+        lead_fingerprint, scoring_version)
+        SELECT %s, client_name, phone_number, email, website, business_category, location, 
+        rating, jumlah_ulasan, potential_score, segmentation, priority, recommendation_category,
+        lead_fingerprint, scoring_version
+        FROM csv_analysis_results
+        WHERE upload_id = %s
+        ORDER BY id
+    """, (upload_id, source_upload_id))
+    cloned_rows = cursor.rowcount
+    copy_summary(cursor, SCOPE_CSV_UPLOAD, source_upload_id, upload_id)
+    
+    cursor.execute(
+        "UPDATE csv_uploads SET status = 'completed', processed_rows = %s, scoring_version = %s WHERE id = %s",
+        (cloned_rows, version, upload_id)
+    )
+    return cloned_rows
+
+def ingest_and_process_csv(stream, filepath, unique_filename, original_filename, engine=None):
+    """Simpan, hitung dan score upload CSV dalam satu pass atas stream upload"""
+    version = scoring_version(engine)
+    started = time.perf_counter()
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        state = {'upload_id': None, 'processed_rows': 0, 'error_rows': 0}
+        token = uuid.uuid4().hex
+        dedup = new_lead_deduplicator(cursor)
+        
+        def process_rows(rows):
+            # Header sudah valid di titik ini, baru buat record upload
+            cursor.execute(
+                "INSERT INTO csv_uploads (filename, original_name, status, processed_rows, processing_token) "
+                "VALUES (%s, %s, 'processing', 0, %s)",
+                (unique_filename, original_filename, token)
+            )
+            state['upload_id'] = cursor.lastrowid
+            conn.commit()
+            
+            chunks = iter_scored_chunks(rows, config.SCORING_BATCH_SIZE, engine=engine, dedup=dedup)
+            for values, chunk_errors in timed_chunks(chunks):
+                state['error_rows'] += chunk_errors
+                state['processed_rows'] += save_csv_results(
+                    conn, cursor, state['upload_id'], values, state['processed_rows'], version, token
+                )
+                update_upload_progress(conn, cursor, state['upload_id'], state['processed_rows'], token)
+        
+        try:
+            row_count, content_hash = ingest_csv_stream(stream, filepath, process_rows)
+        except Exception:
+            if state['upload_id']:
+                conn.rollback()
+                cursor.execute(
+                    "UPDATE csv_uploads SET status = 'failed', processed_rows = %s "
+                    "WHERE id = %s AND processing_token = %s",
+                    (state['processed_rows'], state['upload_id'], token)
+                )
+                conn.commit()
+            raise
+        
+        duplicate_rows = dedup.duplicate_rows if dedup else 0
+        cursor.execute(
+            "UPDATE csv_uploads SET status = 'completed', total_rows = %s, processed_rows = %s, "
+            "duplicate_rows = %s, content_hash = %s, scoring_version = %s WHERE id = %s AND processing_token = %s",
+            (row_count, state['processed_rows'], duplicate_rows, content_hash, version, state['upload_id'], token)
+        )
+        conn.commit()
+        cursor.close()
+    
+    record_csv_throughput(state['processed_rows'], time.perf_counter() - started)
+    return {
+        'upload_id': state['upload_id'],
+        'total_rows': row_count,
+        'processed_rows': state['processed_rows'],
+        'duplicate_rows': duplicate_rows,
+        'error_rows': state['error_rows']
+    }
+
 @app.route('/api/process-csv-upload/<int:upload_id>', methods=['POST'])
 def process_csv_upload(upload_id):
-    """Process uploaded CSV file"""
+    """Queue processing of an uploaded CSV file as a background job"""
     try:
-        # Get upload record
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM csv_uploads WHERE id = %s", (upload_id,))
-        upload_record = cursor.fetchone()
-        
-        if not upload_record:
-            return jsonify({'error': 'Upload record not found'}), 404
+        force = request.args.get('force', '').lower() in ('1', 'true')
+        try:
+            engine = get_scoring_engine()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Update status to processing
-        cursor.execute("UPDATE csv_uploads SET status = 'processing' WHERE id = %s", (upload_id,))
-        conn.commit()
+        # Get upload record
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT * FROM csv_uploads WHERE id = %s", (upload_id,))
+            upload_record = cursor.fetchone()
+            
+            if not upload_record:
+                return jsonify({'error': 'Upload record not found'}), 404
+            
+            # Update status to processing (sekaligus mencegah job ganda). Token baru membuat
+            # job lama yang mungkin masih jalan (force=1) berhenti sebelum commit berikutnya
+            token = uuid.uuid4().hex
+            if force:
+                cursor.execute(
+                    "UPDATE csv_uploads SET status = 'processing', processed_rows = 0, processing_token = %s "
+                    "WHERE id = %s",
+                    (token, upload_id)
+                )
+            else:
+                cursor.execute(
+                    "UPDATE csv_uploads SET status = 'processing', processed_rows = 0, processing_token = %s "
+                    "WHERE id = %s AND status <> 'processing'",
+                    (token, upload_id)
+                )
+            if cursor.rowcount == 0:
+                return jsonify({'error': 'CSV upload is already being processed'}), 409
+            
+            # Hasil proses sebelumnya (termasuk run yang gagal di tengah) dihapus di transaksi
+            # yang sama supaya baris dan ringkasannya tidak tersimpan dua kali
+            cursor.execute("DELETE FROM csv_analysis_results WHERE upload_id = %s", (upload_id,))
+            delete_summary(cursor, SCOPE_CSV_UPLOAD, upload_id)
+            conn.commit()
+            cursor.close()
         
         # Load the CSV file
         filepath = os.path.join(app.config['UPLOAD_FOLDER'], upload_record['filename'])
         
+        # Mode paralel (multi-core) untuk file besar, bisa dipaksa lewat ?parallel=1/0
+        parallel_arg = request.args.get('parallel')
+        if parallel_arg is not None:
+            parallel = parallel_arg.lower() in ('1', 'true')
+        else:
+            parallel = (upload_record['total_rows'] or 0) >= config.PARALLEL_SCORING_MIN_ROWS
+        
+        job_id = submit_job(run_csv_processing, upload_id, filepath, parallel, engine, token,
+                            job_type='process-csv-upload',
+                            meta={'upload_id': upload_id, 'parallel': parallel, 'engine': engine})
+        
+        return jsonify({
+            'message': 'CSV processing started',
+            'job_id': job_id,
+            'upload_id': upload_id,
+            'status': 'processing',
+            'parallel': parallel,
+            'engine': engine
+        }), 202
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def run_csv_processing(upload_id, filepath, parallel=False, engine=None, token=None):
+    """Score seluruh baris CSV dan simpan hasilnya (dijalankan di background job).
+    
+    Berhenti dengan UploadSuperseded jika upload di-reset proses lain (token berubah).
+    """
+    started = time.perf_counter()
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
         processed_rows = 0
+        error_rows = 0
+        dedup = None
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
+            # Di dalam try supaya error di sini juga menandai upload 'failed'
+            version = scoring_version(engine)
+            dedup = new_lead_deduplicator(cursor, upload_id)
+            with open(filepath, 'r', encoding=CSV_ENCODING, newline='') as f:
                 csv_reader = csv.DictReader(f)
                 
                 # Validate required columns
-                required_columns = ['nama', 'kategori_usaha', 'lokasi', 'rating', 'jumlah_ulasan']
-                if not all(col in csv_reader.fieldnames for col in required_columns):
-                    raise Exception(f"CSV must contain columns: {', '.join(required_columns)}")
+                validate_csv_header(csv_reader.fieldnames)
                 
-                for row in csv_reader:
-                    try:
-                        # Extract client data from CSV row
-                        client_data = {
-                            'nama': row.get('nama', '').strip(),
-                            'nomor_telepon': row.get('nomor_telepon', '').strip(),
-                            'email': row.get('email', '').strip(),  # Tambahkan email
-                            'website': row.get('website', '').strip(),  # Tambahkan website
-                            'kategori_usaha': row.get('kategori_usaha', '').strip(),
-                            'lokasi': row.get('lokasi', '').strip(),
-                            'rating': float(row.get('rating', 0)),
-                            'jumlah_ulasan': int(row.get('jumlah_ulasan', 0))
-                        }
-                        
-                        # Skip row jika data penting kosong
-                        if not client_data['nama'] or not client_data['kategori_usaha']:
-                            continue
-                        
-                        # Validate rating
-                        if client_data['rating'] < 0 or client_data['rating'] > 5:
-                            continue
-                        
-                        # Validate jumlah_ulasan
-                        if client_data['jumlah_ulasan'] < 0:
-                            continue
-                        
-                        # Extract features and analyze
-                        features = extract_features_from_data(client_data)
-                        analysis_result = analyze_potential(features)
-                        
-                         # Save to analysis results dengan email dan website
-                        cursor.execute("""
-                            INSERT INTO csv_analysis_results 
-                            (upload_id, client_name, phone_number, email, website, business_category, location, 
-                            rating, jumlah_ulasan, potential_score, segmentation, priority, recommendation_category)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        """, (
-                            upload_id, client_data['nama'], client_data['nomor_telepon'],
-                            client_data['email'], client_data['website'],  # Tambahkan email dan website
-                            client_data['kategori_usaha'], client_data['lokasi'],
-                            client_data['rating'], client_data['jumlah_ulasan'],
-                            analysis_result['skor_potensi'], analysis_result['segmentasi'],
-                            analysis_result['prioritas'], analysis_result['kategori_rekomendasi']
-                        ))
-                        
-                        processed_rows += 1
-                        
-                    except Exception as e:
-                        print(f"Error processing row {processed_rows + 1}: {str(e)}")
-                        continue
+                # Score per chunk (opsional paralel di beberapa core), simpan sesuai urutan baris
+                chunks = iter_scored_chunks(csv_reader, config.SCORING_BATCH_SIZE, parallel, engine, dedup)
+                for values, chunk_errors in timed_chunks(chunks):
+                    error_rows += chunk_errors
+                    processed_rows += save_csv_results(conn, cursor, upload_id, values, processed_rows, version, token)
+                    update_upload_progress(conn, cursor, upload_id, processed_rows, token)
                 
-                # Update upload status
+                # Update upload status (hanya jika upload belum diambil alih proses baru)
+                claim_upload(cursor, upload_id, token)
                 cursor.execute(
-                    "UPDATE csv_uploads SET status = 'completed', processed_rows = %s WHERE id = %s",
-                    (processed_rows, upload_id)
+                    "UPDATE csv_uploads SET status = 'completed', processed_rows = %s, duplicate_rows = %s, "
+                    "scoring_version = %s WHERE id = %s",
+                    (processed_rows, dedup.duplicate_rows if dedup else 0, version, upload_id)
                 )
                 conn.commit()
                 
-        except Exception as e:
-            cursor.execute("UPDATE csv_uploads SET status = 'failed' WHERE id = %s", (upload_id,))
+        except UploadSuperseded:
+            # Status dan hasil upload sekarang milik proses yang baru
+            conn.rollback()
+            raise
+        except Exception:
+            conn.rollback()
+            cursor.execute(
+                "UPDATE csv_uploads SET status = 'failed', processed_rows = %s "
+                "WHERE id = %s AND processing_token <=> %s",
+                (processed_rows, upload_id, token)
+            )
             conn.commit()
-            return jsonify ({'error': f'Failed to process CSV: {str(e)}'}), 500
+            raise
+        finally:
+            cursor.close()
+    
+    record_csv_throughput(processed_rows, time.perf_counter() - started)
+    return {
+        'processed_rows': processed_rows,
+        'duplicate_rows': dedup.duplicate_rows if dedup else 0,
+        'error_rows': error_rows,
+        'upload_id': upload_id
+    }
+
+def timed_chunks(chunks):
+    """Teruskan chunk hasil scoring sambil mencatat waktu parse+scoring sebagai stage 'compute'.
+
+    Query di dalam generator (lookup dedup lead) sudah tercatat sebagai 'db'
+    oleh cursor, jadi waktunya dikurangkan dari 'compute'.
+    """
+    chunks = iter(chunks)
+    while True:
+        started = time.perf_counter()
+        db_before = thread_stage_seconds('db')
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            return
         finally:
+            db_seconds = thread_stage_seconds('db') - db_before
+            record_stage('compute', max(0.0, time.perf_counter() - started - db_seconds))
+        yield chunk
+
+def record_csv_throughput(processed_rows, seconds):
+    inc('csv_rows_processed_total', processed_rows)
+    inc('csv_processing_seconds_total', seconds)
+    if seconds > 0:
+        set_gauge('csv_processing_rows_per_second', processed_rows / seconds)
+
+def update_upload_progress(conn, cursor, upload_id, processed_rows, token=None):
+    """Simpan jumlah baris yang sudah diproses agar bisa dipantau frontend"""
+    if token is None:
+        cursor.execute(
+            "UPDATE csv_uploads SET processed_rows = %s WHERE id = %s",
+            (processed_rows, upload_id)
+        )
+    else:
+        cursor.execute(
+            "UPDATE csv_uploads SET processed_rows = %s WHERE id = %s AND processing_token = %s",
+            (processed_rows, upload_id, token)
+        )
+    conn.commit()
+
+@app.route('/api/csv-upload-status/<int:upload_id>', methods=['GET'])
+def get_csv_upload_status(upload_id):
+    """Progress processing CSV upload (dibaca dari database, aman untuk multi-worker)"""
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                "SELECT id, original_name, status, total_rows, processed_rows FROM csv_uploads WHERE id = %s",
+                (upload_id,)
+            )
+            upload_info = cursor.fetchone()
             cursor.close()
-            conn.close()
         
-        return jsonify({
-            'message': 'CSV processing completed',
-            'processed_rows': processed_rows,
-            'upload_id': upload_id
-        })
+        if not upload_info:
+            return jsonify({'error': 'Upload not found'}), 404
+        
+        total_rows = upload_info['total_rows'] or 0
+        processed_rows = upload_info['processed_rows'] or 0
+        upload_info['progress'] = round(min(100.0, processed_rows * 100.0 / total_rows), 1) if total_rows else 0.0
+        
+        return jsonify(upload_info)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Status background job yang dijalankan oleh worker ini"""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 @app.route('/api/csv-uploads', methods=['GET'])
 def get_csv_uploads():
     """Get all CSV uploads"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM csv_uploads ORDER BY created_at DESC")
-        uploads = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT * FROM csv_uploads ORDER BY created_at DESC")
+            uploads = cursor.fetchall()
+            cursor.close()
         return jsonify(uploads)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/csv-results/<int:upload_id>', methods=['GET'])
 def get_csv_results(upload_id):
-    """Get results for a specific CSV upload"""
+    """Get results for a specific CSV upload (keyset pagination, filter dan sort)"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
+        limit = get_page_limit()
+        sort = request.args.get('sort', 'score')
+        if sort not in ('score', 'newest'):
+            return jsonify({'error': "sort must be 'score' or 'newest'"}), 400
         
-        # Get upload info
-        cursor.execute("SELECT * FROM csv_uploads WHERE id = %s", (upload_id,))
-        upload_info = cursor.fetchone()
+        conditions, params = get_result_filters({
+            'nama': 'client_name',
+            'prioritas': 'priority',
+            'segmentasi': 'segmentation',
+            'kategori': 'business_category',
+            'score': 'potential_score'
+        })
+        filter_conditions, filter_params = list(conditions), list(params)
         
-        if not upload_info:
-            return jsonify({'error': 'Upload not found'}), 404
+        cursor_value = request.args.get('cursor')
+        if cursor_value:
+            if sort == 'score':
+                last_score, last_id = decode_cursor(cursor_value, 2)
+                conditions.append("(potential_score < %s OR (potential_score = %s AND id < %s))")
+                params.extend([last_score, last_score, last_id])
+            else:
+                last_id, = decode_cursor(cursor_value, 1)
+                conditions.append("id < %s")
+                params.append(last_id)
         
-        # Get results with sorting by score
-        cursor.execute("""
-            SELECT * FROM csv_analysis_results 
-            WHERE upload_id = %s 
-            ORDER BY potential_score DESC
-        """, (upload_id,))
+        order_by = 'potential_score DESC, id DESC' if sort == 'score' else 'id DESC'
+        where = ''.join(f" AND {condition}" for condition in conditions)
         
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            
+            # Get upload info
+            cursor.execute("SELECT * FROM csv_uploads WHERE id = %s", (upload_id,))
+            upload_info = cursor.fetchone()
+            
+            if not upload_info:
+                return jsonify({'error': 'Upload not found'}), 404
+            
+            # Get results with sorting by score (index upload_id, potential_score)
+            cursor.execute(f"""
+                SELECT * FROM csv_analysis_results 
+                WHERE upload_id = %s{where}
+                ORDER BY {order_by}
+                LIMIT %s
+            """, [upload_id] + params + [limit + 1])
+            results = cursor.fetchall()
+            
+            # Total hanya dihitung di halaman pertama
+            total_results = None
+            if not cursor_value:
+                filter_where = ''.join(f" AND {condition}" for condition in filter_conditions)
+                cursor.execute(
+                    f"SELECT COUNT(*) AS total FROM csv_analysis_results WHERE upload_id = %s{filter_where}",
+                    [upload_id] + filter_params
+                )
+                total_results = cursor.fetchone()['total']
+            cursor.close()
+        
+        next_cursor = None
+        if len(results) > limit:
+            results = results[:limit]
+            last = results[-1]
+            next_cursor = encode_cursor(
+                [last['potential_score'], last['id']] if sort == 'score' else [last['id']]
+            )
         
         return jsonify({
             'upload_info': upload_info,
             'results': results,
-            'total_results': len(results)
+            'total_results': total_results,
+            'next_cursor': next_cursor
         })
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/csv-summary/<int:upload_id>', methods=['GET'])
+def get_csv_summary(upload_id):
+    """Ringkasan hasil analisis satu upload CSV dari tabel agregat"""
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            summary = fetch_summary(cursor, SCOPE_CSV_UPLOAD, upload_id)
+            cursor.close()
+        
+        summary['upload_id'] = upload_id
+        return jsonify(summary)
+        
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -701,61 +1391,12 @@ def get_csv_results(upload_id):
 def download_csv_results(upload_id):
     """Download CSV results - hanya kolom penting untuk download"""
     try:
-        # Get results
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("""
-            SELECT * FROM csv_analysis_results 
-            WHERE upload_id = %s 
-            ORDER BY potential_score DESC
-        """, (upload_id,))
-        
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        # Create CSV in memory - GABUNGAN LENGKAP
-        output = io.StringIO()
-        fieldnames = [
-            'rank', 
-            'client_name', 
-            'phone_number', 
-            'email', 
-            'website',
-            'business_category', 
-            'location', 
-            'rating', 
-            'review_count',
-            'potential_score', 
-            'segmentation', 
-            'priority', 
-            'recommendation_category'
-        ]
-        
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for i, result in enumerate(results):
-            writer.writerow({
-                'rank': i + 1,
-                'client_name': result['client_name'],
-                'phone_number': result['phone_number'] or '-',
-                'email': result['email'] or '-',
-                'website': result['website'] or '-',
-                'business_category': result['business_category'],
-                'location': result['location'],
-                'rating': result['rating'],
-                'review_count': result['jumlah_ulasan'],
-                'potential_score': result['potential_score'],
-                'segmentation': result['segmentation'],
-                'priority': result['priority'],
-                'recommendation_category': result['recommendation_category']
-            })
-        
-        output.seek(0)
+        chunks = generate_csv_results(upload_id)
+        # Ambil chunk pertama sekarang supaya error query tetap jadi response JSON 500
+        first_chunk = next(chunks)
         
         return Response(
-            output,
+            prepend_chunk(first_chunk, chunks),
             mimetype="text/csv",
             headers={"Content-Disposition": f"attachment;filename=client_analysis_{upload_id}.csv"}
         )
@@ -763,6 +1404,68 @@ def download_csv_results(upload_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def prepend_chunk(first_chunk, chunks):
+    try:
+        yield first_chunk
+        yield from chunks
+    finally:
+        chunks.close()
+
+def generate_csv_results(upload_id):
+    """Stream hasil CSV per batch dengan cursor unbuffered (server-side), bukan fetchall"""
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=CSV_DOWNLOAD_FIELDNAMES)
+    writer.writeheader()
+    
+    with db_connection() as conn:
+        cursor = conn.cursor(dictionary=True, buffered=False)
+        try:
+            cursor.execute("""
+                SELECT client_name, phone_number, email, website, business_category, location,
+                       rating, jumlah_ulasan, potential_score, segmentation, priority, recommendation_category
+                FROM csv_analysis_results 
+                WHERE upload_id = %s 
+                ORDER BY potential_score DESC
+            """, (upload_id,))
+            
+            rank = 0
+            while True:
+                results = cursor.fetchmany(config.EXPORT_BATCH_SIZE)
+                if not results:
+                    break
+                
+                for result in results:
+                    rank += 1
+                    writer.writerow({
+                        'rank': rank,
+                        'client_name': result['client_name'],
+                        'phone_number': result['phone_number'] or '-',
+                        'email': result['email'] or '-',
+                        'website': result['website'] or '-',
+                        'business_category': result['business_category'],
+                        'location': result['location'],
+                        'rating': result['rating'],
+                        'review_count': result['jumlah_ulasan'],
+                        'potential_score': result['potential_score'],
+                        'segmentation': result['segmentation'],
+                        'priority': result['priority'],
+                        'recommendation_category': result['recommendation_category']
+                    })
+                
+                # Kirim chunk yang sudah jadi lalu kosongkan buffer
+                yield output.getvalue()
+                output.seek(0)
+                output.truncate(0)
+        finally:
+            # Download bisa dibatalkan di tengah jalan; buang sisa hasil query
+            # supaya koneksi kembali ke pool dalam keadaan bersih
+            conn.consume_results()
+            cursor.close()
+    
+    remaining = output.getvalue()
+    if remaining:
+        yield remaining
+
 @app.route('/api/debug/uploads', methods=['GET'])
 def debug_uploads():
     """Debug endpoint to check upload folder"""
@@ -791,30 +1494,34 @@ def debug_uploads():
 def delete_csv_upload(upload_id):
     """Delete CSV upload and associated data"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        
-        # Get upload record to find filename
-        cursor.execute("SELECT * FROM csv_uploads WHERE id = %s", (upload_id,))
-        upload_record = cursor.fetchone()
-        
-        if not upload_record:
-            return jsonify({'error': 'Upload record not found'}), 404
-        
-        # Delete associated analysis results first
-        cursor.execute("DELETE FROM csv_analysis_results WHERE upload_id = %s", (upload_id,))
-        
-        # Delete the upload record
-        cursor.execute("DELETE FROM csv_uploads WHERE id = %s", (upload_id,))
-        
-        # Delete the actual CSV file
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], upload_record['filename'])
-        if os.path.exists(filepath):
-            os.remove(filepath)
-        
-        conn.commit()
-        cursor.close()
-        conn.close()
+        with db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            
+            # Get upload record to find filename
+            cursor.execute("SELECT * FROM csv_uploads WHERE id = %s", (upload_id,))
+            upload_record = cursor.fetchone()
+            
+            if not upload_record:
+                return jsonify({'error': 'Upload record not found'}), 404
+            
+            # Delete associated analysis results first
+            cursor.execute("DELETE FROM csv_analysis_results WHERE upload_id = %s", (upload_id,))
+            delete_summary(cursor, SCOPE_CSV_UPLOAD, upload_id)
+            
+            # Delete the upload record
+            cursor.execute("DELETE FROM csv_uploads WHERE id = %s", (upload_id,))
+            
+            # Delete the actual CSV file, kecuali masih dipakai upload lain (upload duplikat)
+            cursor.execute(
+                "SELECT COUNT(*) AS refs FROM csv_uploads WHERE filename = %s",
+                (upload_record['filename'],)
+            )
+            filepath = os.path.join(app.config['UPLOAD_FOLDER'], upload_record['filename'])
+            if cursor.fetchone()['refs'] == 0 and os.path.exists(filepath):
+                os.remove(filepath)
+            
+            conn.commit()
+            cursor.close()
         
         return jsonify({
             'message': 'CSV upload and associated data deleted successfully',
@@ -828,7 +1535,7 @@ def delete_csv_upload(upload_id):
 
 if __name__ == '__main__':
     # Initialize models if they don't exist
-    if not os.path.exists(MODEL_PATH) or not os.path.exists(SCALER_PATH) or not os.path.exists(KMEANS_PATH):
+    if not MODEL_REGISTRY.available():
         print("Initializing models...")
         from model_utils import train_initial_models
         train_initial_models()
@@ -0,0 +1,266 @@
+"""Benchmark pipeline scoring dengan dataset lead sintetis berbentuk Book2.csv.
+
+Dataset dibuat ulang secara deterministik (--seed), lalu setiap tahap diukur:
+parse CSV, scoring per baris (extract_features_from_data + analyze_potential),
+ekstraksi fitur batch, scoring batch, pipeline CSV lengkap, insert ke database
+dan export hasil. Database default adalah SQLite sementara sebagai pengganti
+MySQL; --db mysql memakai koneksi dari .env dan fungsi insert/export app.py.
+Hasil dicetak sebagai JSON.
+
+    python benchmarks/scoring_benchmark.py --sizes 1000,100000,1000000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np
+import pandas as pd
+from config import get_config
+from csv_utils import CSV_DOWNLOAD_FIELDNAMES, CSV_ENCODING, iter_scored_chunks, parse_csv_row
+from scoring_utils import (
+    _match_location_cached, analyze_potential, analyze_potential_batch,
+    extract_features_batch, extract_features_from_data, location_cache_stats
+)
+
+config = get_config()
+
+CSV_COLUMNS = ['nama', 'nomor_telepon', 'kategori_usaha', 'lokasi', 'rating', 'jumlah_ulasan', 'email', 'website']
+
+# Bahan dataset sintetis (mirip data scraping Google Maps di Book2.csv)
+BUSINESS_NAMES = ['Jaya', 'Makmur', 'Sentosa', 'Abadi', 'Berkah', 'Sejahtera', 'Mandiri', 'Sinar',
+                  'Cahaya', 'Mitra', 'Karya', 'Putra', 'Indah', 'Barokah', 'Lestari', 'Azeema']
+CATEGORIES = ['Retail', 'Dokter Gigi', 'Toko Elektronik', 'Toko Mebel', 'Klinik Gigi',
+              'Perajin furnitur', 'Pabrikan mebel', 'Makanan', 'Restoran', 'Fashion', 'Jasa',
+              'Otomotif', 'Pendidikan', 'Teknologi', 'Kesehatan', 'Toko Hewan Peliharaan']
+CITIES = [
+    ('Kota Pekalongan', 'Jawa Tengah', 51100), ('Kabupaten Batang', 'Jawa Tengah', 51200),
+    ('Kota Tegal', 'Jawa Tengah', 52100), ('Kota Surakarta', 'Jawa Tengah', 57100),
+    ('Kota Semarang', 'Jawa Tengah', 50100), ('Kota Yogyakarta', 'Daerah Istimewa Yogyakarta', 55100),
+    ('Kota Bandung', 'Jawa Barat', 40100), ('Kota Bogor', 'Jawa Barat', 16100),
+    ('Kota Depok', 'Jawa Barat', 16400), ('Kota Bekasi', 'Jawa Barat', 17100),
+    ('Kota Tangerang', 'Banten', 15100), ('Kota Jakarta Selatan', 'Daerah Khusus Ibukota Jakarta', 12100),
+    ('Kota Jakarta Pusat', 'Daerah Khusus Ibukota Jakarta', 10100), ('Kota Surabaya', 'Jawa Timur', 60100),
+    ('Kota Malang', 'Jawa Timur', 65100), ('Kota Denpasar', 'Bali', 80100),
+    ('Kota Medan', 'Sumatera Utara', 20100), ('Kota Makassar', 'Sulawesi Selatan', 90100)
+]
+STREETS = ['Jl. Veteran', 'Jl. Hos Cokroaminoto', 'Jl. Jend. Sudirman', 'Jl. Diponegoro',
+           'Jl. Gajah Mada', 'Jl. Ahmad Yani', 'Jl. Pemuda', 'Jl. Raya Utama', 'Jl. Merdeka',
+           'Jl. Pahlawan', 'Jl. Kartini', 'Jl. Imam Bonjol']
+AREA_HINTS = ['', '', '', 'Kawasan Perkantoran, ', 'Perumahan Griya Asri, ', 'Mall Plaza, ',
+              'Pusat Niaga, ', 'Desa Kecil, ']
+SUBDISTRICTS = ['Dukuh', 'Kuripan Lor', 'Menteng', 'Kebayoran Baru', 'Sukajadi', 'Tegalrejo',
+                'Pondok Indah', 'Kauman', 'Panjang Wetan', 'Medono', 'Bendan', 'Podosugih']
+WEBSITES = ['', '', '', 'tokopedia.com', 'shopee.co.id', 'instagram.com', 'facebook.com']
+
+def make_addresses(count, rng):
+    streets = rng.choice(STREETS, count)
+    numbers = rng.randint(1, 250, count)
+    hints = rng.choice(AREA_HINTS, count)
+    subdistricts = rng.choice(SUBDISTRICTS, count)
+    city_index = rng.randint(0, len(CITIES), count)
+    return [
+        f"{hint}{street} No.{number}, {sub}, Kec. {sub}, {CITIES[c][0]}, {CITIES[c][1]} {CITIES[c][2] + number % 90}"
+        for hint, street, number, sub, c in zip(hints, streets, numbers, subdistricts, city_index)
+    ]
+
+def generate_dataset(path, n_rows, seed=42, address_pool_ratio=0.2):
+    """Tulis CSV sintetis n_rows baris; alamat diambil dari pool supaya ada duplikat seperti data asli"""
+    rng = np.random.RandomState(seed)
+    addresses = make_addresses(max(100, int(n_rows * address_pool_ratio)), rng)
+
+    names = rng.choice(BUSINESS_NAMES, n_rows)
+    categories = rng.choice(CATEGORIES, n_rows)
+    address_index = rng.randint(0, len(addresses), n_rows)
+    ratings = np.round(np.clip(rng.normal(4.4, 0.5, n_rows), 1, 5), 1)
+    reviews = np.minimum(rng.lognormal(4.0, 1.3, n_rows).astype(int), 20000)
+    phones = rng.randint(0, 10 ** 8, n_rows)
+    websites = rng.choice(WEBSITES, n_rows)
+
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        for i in range(n_rows):
+            name = f"{names[i]} {categories[i]} {i}"
+            writer.writerow([
+                name, f"0812-{phones[i] // 10000:04d}-{phones[i] % 10000:04d}", categories[i],
+                addresses[address_index[i]], ratings[i], reviews[i],
+                f"{names[i].lower()}{i}@gmail.com" if i % 3 == 0 else '', websites[i]
+            ])
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    def run(self, name, rows, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - started
+        self.stages[name] = {
+            'seconds': round(seconds, 4),
+            'rows': rows,
+            'rows_per_sec': round(rows / seconds, 1) if seconds > 0 else None
+        }
+        return result
+
+def parse_rows(path):
+    with open(path, 'r', encoding=CSV_ENCODING, newline='') as f:
+        return [client for client in map(parse_csv_row, csv.DictReader(f)) if client is not None]
+
+def score_per_row(clients):
+    return [analyze_potential(extract_features_from_data(client)) for client in clients]
+
+def run_csv_pipeline(path):
+    values = []
+    with open(path, 'r', encoding=CSV_ENCODING, newline='') as f:
+        for chunk_values, _ in iter_scored_chunks(csv.DictReader(f), config.SCORING_BATCH_SIZE):
+            values.extend(chunk_values)
+    return values
+
+SQLITE_SCHEMA = """
+    CREATE TABLE csv_analysis_results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        upload_id INTEGER, client_name TEXT, phone_number TEXT, email TEXT, website TEXT,
+        business_category TEXT, location TEXT, rating REAL, jumlah_ulasan INTEGER,
+        potential_score INTEGER, segmentation TEXT, priority TEXT, recommendation_category TEXT,
+        lead_fingerprint TEXT
+    )
+"""
+
+def sqlite_insert(conn, values):
+    sql = ("INSERT INTO csv_analysis_results (upload_id, client_name, phone_number, email, website, "
+           "business_category, location, rating, jumlah_ulasan, potential_score, segmentation, priority, "
+           "recommendation_category, lead_fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+    for start in range(0, len(values), config.CSV_INSERT_BATCH_SIZE):
+        conn.executemany(sql, [(1,) + row for row in values[start:start + config.CSV_INSERT_BATCH_SIZE]])
+        conn.commit()
+
+def sqlite_export(conn):
+    """Sama dengan generate_csv_results: fetchmany per EXPORT_BATCH_SIZE ke CSV writer"""
+    cursor = conn.execute("""
+        SELECT client_name, phone_number, email, website, business_category, location,
+               rating, jumlah_ulasan, potential_score, segmentation, priority, recommendation_category
+        FROM csv_analysis_results WHERE upload_id = 1 ORDER BY potential_score DESC
+    """)
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(CSV_DOWNLOAD_FIELDNAMES)
+    exported_bytes, rank = 0, 0
+    while True:
+        rows = cursor.fetchmany(config.EXPORT_BATCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            rank += 1
+            name, phone, email, website = row[:4]
+            writer.writerow((rank, name, phone or '-', email or '-', website or '-') + tuple(row[4:]))
+        exported_bytes += len(output.getvalue())
+        output.seek(0)
+        output.truncate(0)
+    return exported_bytes
+
+def bench_database_sqlite(timer, values, workdir):
+    conn = sqlite3.connect(os.path.join(workdir, f"benchmark_{len(values)}.db"))
+    try:
+        conn.execute(SQLITE_SCHEMA)
+        timer.run('db_insert', len(values), sqlite_insert, conn, values)
+        return timer.run('export', len(values), sqlite_export, conn)
+    finally:
+        conn.close()
+
+def bench_database_mysql(timer, values):
+    """Insert dan export lewat fungsi app.py terhadap MySQL sungguhan, lalu bersihkan datanya"""
+    from app import generate_csv_results, save_csv_results
+    from db_utils import db_connection
+    from summary_utils import SCOPE_CSV_UPLOAD, delete_summary
+
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT INTO csv_uploads (filename, original_name, status) VALUES (%s, %s, 'processing')",
+            ('benchmark.csv', 'benchmark.csv')
+        )
+        upload_id = cursor.lastrowid
+        conn.commit()
+        try:
+            timer.run('db_insert', len(values), save_csv_results, conn, cursor, upload_id, values)
+            return timer.run('export', len(values),
+                             lambda: sum(len(chunk) for chunk in generate_csv_results(upload_id)))
+        finally:
+            cursor.execute("DELETE FROM csv_analysis_results WHERE upload_id = %s", (upload_id,))
+            delete_summary(cursor, SCOPE_CSV_UPLOAD, upload_id)
+            cursor.execute("DELETE FROM csv_uploads WHERE id = %s", (upload_id,))
+            conn.commit()
+            cursor.close()
+
+def bench_size(n_rows, args, workdir):
+    timer = StageTimer()
+    path = os.path.join(workdir, f"leads_{n_rows}.csv")
+    timer.run('generate', n_rows, generate_dataset, path, n_rows, args.seed)
+
+    clients = timer.run('parse', n_rows, parse_rows, path)
+
+    sample = clients[:args.per_row_max]
+    _match_location_cached.cache_clear()
+    timer.run('per_row_scoring', len(sample), score_per_row, sample)
+
+    _match_location_cached.cache_clear()
+    clients_df = pd.DataFrame(clients, columns=['kategori_usaha', 'lokasi', 'rating', 'jumlah_ulasan'])
+    features = timer.run('feature_extraction', len(clients), extract_features_batch, clients_df)
+    timer.run('batch_scoring', len(clients), analyze_potential_batch, features)
+
+    _match_location_cached.cache_clear()
+    values = timer.run('csv_pipeline', n_rows, run_csv_pipeline, path)
+    cache = location_cache_stats()
+
+    if args.db == 'mysql':
+        exported_bytes = bench_database_mysql(timer, values)
+    else:
+        exported_bytes = bench_database_sqlite(timer, values, workdir)
+
+    return {
+        'rows': n_rows,
+        'scored_rows': len(values),
+        'exported_bytes': exported_bytes,
+        'location_cache_hit_rate': cache['hit_rate'],
+        'stages': timer.stages
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,100000,1000000',
+                        help='jumlah baris dataset, dipisah koma')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--per-row-max', type=int, default=100000,
+                        help='batas baris untuk tahap scoring per baris (jalur lambat)')
+    parser.add_argument('--db', choices=['sqlite', 'mysql'], default='sqlite')
+    parser.add_argument('--output', help='simpan hasil JSON ke file ini juga')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    with tempfile.TemporaryDirectory(prefix='scoring-benchmark-') as workdir:
+        results = [bench_size(n_rows, args, workdir) for n_rows in sizes]
+
+    report = json.dumps({
+        'benchmark': 'scoring',
+        'seed': args.seed,
+        'db': args.db,
+        'scoring_batch_size': config.SCORING_BATCH_SIZE,
+        'insert_batch_size': config.CSV_INSERT_BATCH_SIZE,
+        'results': results
+    }, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    print(report)
+
+if __name__ == '__main__':
+    main()
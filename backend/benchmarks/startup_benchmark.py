@@ -0,0 +1,69 @@
+"""Benchmark cold start backend: waktu import app dan request /api/health pertama.
+
+Setiap run memakai interpreter Python baru supaya cache import tidak ikut
+terhitung. Hasil dicetak sebagai JSON.
+
+    python benchmarks/startup_benchmark.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modul berat yang seharusnya belum ter-load setelah start
+HEAVY_MODULES = ['pandas', 'sklearn', 'scipy', 'joblib']
+
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+with app.app.test_client() as client:
+    response = client.get('/api/health')
+ready = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - started,
+    'first_health_seconds': ready - imported,
+    'ready_seconds': ready - started,
+    'health_status': response.status_code,
+    'heavy_modules_loaded': [m for m in %r if m in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+def run_once():
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    ).stdout
+    # Baris terakhir adalah hasil JSON (baris sebelumnya bisa berisi log app)
+    return json.loads(output.strip().splitlines()[-1])
+
+def summarize(values):
+    return {
+        'min': round(min(values), 4),
+        'median': round(statistics.median(values), 4),
+        'max': round(max(values), 4)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    print(json.dumps({
+        'benchmark': 'startup',
+        'runs': args.runs,
+        'import_seconds': summarize([r['import_seconds'] for r in runs]),
+        'first_health_seconds': summarize([r['first_health_seconds'] for r in runs]),
+        'ready_seconds': summarize([r['ready_seconds'] for r in runs]),
+        'health_status': sorted({r['health_status'] for r in runs}),
+        'heavy_modules_loaded': sorted({m for r in runs for m in r['heavy_modules_loaded']})
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
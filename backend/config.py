@@ -1,16 +1,8 @@
 import os
 from dotenv import load_dotenv
-from config import Config
 
 # Load environment variables
 load_dotenv()
-    
-class DevelopmentConfig(Config):
-    FLASK_DEBUG = True
-
-class ProductionConfig(Config):
-    FLASK_DEBUG = False
-    FLASK_ENV = 'production'
 
 class Config:
     # Flask Configuration
@@ -24,15 +16,45 @@ class Config:
     DB_NAME = os.getenv('DB_NAME', 'client_analysis')
     DB_USER = os.getenv('DB_USER', 'root')
     DB_PASSWORD = os.getenv('DB_PASSWORD', '')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))
+    SCHEMA_CHECK = os.getenv('SCHEMA_CHECK', 'True').lower() == 'true'  # gagal start jika migrasi belum dijalankan
     
     # Model Configuration
     MODEL_PATH = os.getenv('MODEL_PATH', 'potensi_model.joblib')
     SCALER_PATH = os.getenv('SCALER_PATH', 'scaler.joblib')
     KMEANS_PATH = os.getenv('KMEANS_PATH', 'kmeans_model.joblib')
+    MODEL_PRELOAD = os.getenv('MODEL_PRELOAD', 'True').lower() == 'true'
+    MODELS_DIR = os.getenv('MODELS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+    MODEL_KEEP_VERSIONS = int(os.getenv('MODEL_KEEP_VERSIONS', 5))
     
     # Feature Extraction Configuration
     MIN_SAMPLE_SIZE = int(os.getenv('MIN_SAMPLE_SIZE', 10))
     TRAINING_THRESHOLD = int(os.getenv('TRAINING_THRESHOLD', 50))
+    TRAINING_CHUNK_SIZE = int(os.getenv('TRAINING_CHUNK_SIZE', 5000))
+    TRAINING_MAX_ROWS = int(os.getenv('TRAINING_MAX_ROWS', 200000))
+    SCORING_ENGINE = os.getenv('SCORING_ENGINE', 'rules')  # rules | model
+    SCORING_BATCH_SIZE = int(os.getenv('SCORING_BATCH_SIZE', 5000))
+    LOCATION_CACHE_SIZE = int(os.getenv('LOCATION_CACHE_SIZE', 4096))
+    SCORING_TABLES_PATH = os.getenv('SCORING_TABLES_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scoring_tables.json'))
+    SCORING_TABLES_CHECK_SECONDS = float(os.getenv('SCORING_TABLES_CHECK_SECONDS', 5))  # 0 = hanya reload lewat endpoint
+    KATEGORI_CACHE_SIZE = int(os.getenv('KATEGORI_CACHE_SIZE', 10000))
+    CSV_INSERT_BATCH_SIZE = int(os.getenv('CSV_INSERT_BATCH_SIZE', 1000))
+    BACKGROUND_WORKERS = int(os.getenv('BACKGROUND_WORKERS', 2))
+    SCORING_PROCESSES = int(os.getenv('SCORING_PROCESSES', 0))  # 0 = semua core
+    PARALLEL_SCORING_MIN_ROWS = int(os.getenv('PARALLEL_SCORING_MIN_ROWS', 50000))
+    
+    # Upload Configuration
+    MAX_UPLOAD_MB = int(os.getenv('MAX_UPLOAD_MB', 16))
+    CSV_STREAM_CHUNK_SIZE = int(os.getenv('CSV_STREAM_CHUNK_SIZE', 1024 * 1024))
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+    BULK_INSERT_BATCH_SIZE = int(os.getenv('BULK_INSERT_BATCH_SIZE', 1000))
+    DUPLICATE_LEADS = os.getenv('DUPLICATE_LEADS', 'skip')  # skip | keep
+    RESCORE_BATCH_SIZE = int(os.getenv('RESCORE_BATCH_SIZE', 2000))
+    
+    # Pagination Configuration
+    PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 50))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 500))
     
     # Server Configuration
     HOST = os.getenv('HOST', '0.0.0.0')
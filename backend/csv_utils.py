@@ -0,0 +1,305 @@
+import csv
+import hashlib
+import io
+import itertools
+import math
+import multiprocessing
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from config import get_config
+from scoring_utils import score_clients_batch
+
+config = get_config()
+
+# Validate required columns
+REQUIRED_COLUMNS = ['nama', 'kategori_usaha', 'lokasi', 'rating', 'jumlah_ulasan']
+
+# utf-8-sig supaya file CSV dari Excel (dengan BOM) tetap terbaca header-nya
+CSV_ENCODING = 'utf-8-sig'
+
+# Kolom file hasil analisis yang di-download (/api/download-csv-results)
+CSV_DOWNLOAD_FIELDNAMES = [
+    'rank',
+    'client_name',
+    'phone_number',
+    'email',
+    'website',
+    'business_category',
+    'location',
+    'rating',
+    'review_count',
+    'potential_score',
+    'segmentation',
+    'priority',
+    'recommendation_category'
+]
+
+# Lead yang sudah dikenal saat ingest: 'skip' (tidak di-score/disimpan lagi) atau 'keep'
+DUPLICATE_LEAD_MODES = ('skip', 'keep')
+
+# Batas kolom INT (signed) MySQL untuk jumlah_ulasan
+MAX_JUMLAH_ULASAN = 2**31 - 1
+
+_NON_DIGITS = re.compile(r'\D+')
+_NON_WORDS = re.compile(r'[^0-9a-z]+')
+
+_process_pool = None
+_process_pool_pid = None
+_process_pool_lock = threading.Lock()
+
+def parse_csv_row(row):
+    """Ubah satu baris CSV menjadi client_data; None jika baris harus dilewati"""
+    # Extract client data from CSV row
+    client_data = {
+        'nama': row.get('nama', '').strip(),
+        'nomor_telepon': row.get('nomor_telepon', '').strip(),
+        'email': row.get('email', '').strip(),
+        'website': row.get('website', '').strip(),
+        'kategori_usaha': row.get('kategori_usaha', '').strip(),
+        'lokasi': row.get('lokasi', '').strip(),
+        'rating': float(row.get('rating', 0)),
+        'jumlah_ulasan': int(row.get('jumlah_ulasan', 0))
+    }
+
+    # Skip row jika data penting kosong
+    if not client_data['nama'] or not client_data['kategori_usaha']:
+        return None
+
+    # Validate rating (NaN/inf dari float() juga ditolak)
+    if not math.isfinite(client_data['rating']) or client_data['rating'] < 0 or client_data['rating'] > 5:
+        return None
+
+    # Validate jumlah_ulasan (kolom INT di database)
+    if client_data['jumlah_ulasan'] < 0 or client_data['jumlah_ulasan'] > MAX_JUMLAH_ULASAN:
+        return None
+
+    return client_data
+
+def normalize_phone(value):
+    """Digit nomor telepon tanpa kode negara/awalan 0 (+62 812-345 dan 0812345 -> 812345)"""
+    digits = _NON_DIGITS.sub('', str(value or ''))
+    if digits.startswith('62'):
+        digits = digits[2:]
+    return digits.lstrip('0')
+
+def _normalize_text(value):
+    return ' '.join(_NON_WORDS.sub(' ', str(value or '').lower()).split())
+
+def lead_fingerprint(nama, nomor_telepon, lokasi):
+    """Key lead (hash 128-bit, hex): nomor telepon + nama, atau nama + alamat jika tidak ada nomor"""
+    nama = _normalize_text(nama)
+    if not nama:
+        return None
+    phone = normalize_phone(nomor_telepon)
+    if len(phone) >= 6:
+        key = f"phone|{phone}|{nama}"
+    else:
+        key = f"address|{nama}|{_normalize_text(lokasi)}"
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+
+def _is_valid_row(row):
+    try:
+        return parse_csv_row(row) is not None
+    except Exception:
+        return False
+
+class LeadDeduplicator:
+    """Buang baris CSV yang lead-nya sudah dikenal sebelum di-score.
+
+    find_known(fingerprints) mengembalikan fingerprint yang sudah tersimpan
+    (satu query per chunk lewat index lead_fingerprint). Fingerprint chunk
+    yang belum tersimpan (masih in-flight) disimpan di jendela kecil supaya
+    duplikat di dalam upload yang sama juga terdeteksi.
+    """
+
+    def __init__(self, find_known):
+        self.find_known = find_known
+        self.recent = deque()
+        self.duplicate_rows = 0
+
+    def filter_rows(self, rows, window=1):
+        # Hanya baris yang lolos validasi yang diberi fingerprint; baris invalid tetap
+        # diteruskan (dihitung error/dilewati saat scoring) tanpa menutupi salinan valid berikutnya
+        fingerprints = [
+            lead_fingerprint(row.get('nama'), row.get('nomor_telepon'), row.get('lokasi'))
+            if _is_valid_row(row) else None
+            for row in rows
+        ]
+        candidates = {fingerprint for fingerprint in fingerprints if fingerprint is not None}
+        known = self.find_known(candidates) if candidates else set()
+
+        seen = set()
+        kept = []
+        for row, fingerprint in zip(rows, fingerprints):
+            if fingerprint is not None:
+                if fingerprint in known or fingerprint in seen or any(fingerprint in chunk for chunk in self.recent):
+                    self.duplicate_rows += 1
+                    continue
+                seen.add(fingerprint)
+            kept.append(row)
+
+        self.recent.append(seen)
+        while len(self.recent) > window:
+            self.recent.popleft()
+        return kept
+
+def score_csv_rows(rows, first_row_number=1, engine=None):
+    """Parse dan score satu chunk baris CSV.
+
+    Mengembalikan (values, error_count); values berisi tuple kolom
+    csv_analysis_results tanpa upload_id (diakhiri lead_fingerprint),
+    dengan urutan sama seperti input.
+    """
+    client_rows = []
+    error_count = 0
+    for row_number, row in enumerate(rows, start=first_row_number):
+        try:
+            client_data = parse_csv_row(row)
+        except Exception as e:
+            print(f"Error processing row {row_number}: {str(e)}")
+            error_count += 1
+            continue
+        if client_data is not None:
+            client_rows.append(client_data)
+
+    if not client_rows:
+        return [], error_count
+
+    scored = score_clients_batch(client_rows, engine)
+    values = [
+        (
+            client_data['nama'], client_data['nomor_telepon'],
+            client_data['email'], client_data['website'],
+            client_data['kategori_usaha'], client_data['lokasi'],
+            client_data['rating'], client_data['jumlah_ulasan'],
+            int(analysis_result.skor_potensi), analysis_result.segmentasi,
+            analysis_result.prioritas, analysis_result.kategori_rekomendasi,
+            lead_fingerprint(client_data['nama'], client_data['nomor_telepon'], client_data['lokasi'])
+        )
+        for client_data, analysis_result in zip(client_rows, scored.itertuples(index=False))
+    ]
+    return values, error_count
+
+def get_process_pool():
+    """Process pool per proses untuk scoring paralel.
+
+    Memakai start method 'spawn' karena pool dibuat dari thread background job;
+    fork dari proses multi-thread bisa mewarisi lock yang sedang terkunci.
+    """
+    global _process_pool, _process_pool_pid
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool_pid != os.getpid():
+            _process_pool = ProcessPoolExecutor(
+                max_workers=scoring_process_count(),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _process_pool_pid = os.getpid()
+    return _process_pool
+
+def scoring_process_count():
+    """Jumlah proses scoring; SCORING_PROCESSES=0 berarti semua core"""
+    return config.SCORING_PROCESSES or os.cpu_count() or 1
+
+def _iter_chunks(rows, chunk_size):
+    rows = iter(rows)
+    first_row_number = 1
+    while True:
+        chunk = list(itertools.islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield first_row_number, chunk
+        first_row_number += len(chunk)
+
+def iter_scored_chunks(rows, chunk_size, parallel=False, engine=None, dedup=None):
+    """Score baris CSV per chunk dan yield (values, error_count) sesuai urutan baris asli.
+
+    Jika parallel=True, chunk di-score di ProcessPoolExecutor dengan jumlah
+    chunk in-flight dibatasi supaya memori tetap terbatas. dedup
+    (LeadDeduplicator, opsional) membuang lead yang sudah dikenal sebelum scoring.
+    """
+    if not parallel:
+        for first_row_number, chunk in _iter_chunks(rows, chunk_size):
+            if dedup is not None:
+                chunk = dedup.filter_rows(chunk)
+            yield score_csv_rows(chunk, first_row_number, engine)
+        return
+
+    pool = get_process_pool()
+    max_in_flight = scoring_process_count() * 2
+    pending = deque()
+    for first_row_number, chunk in _iter_chunks(rows, chunk_size):
+        if dedup is not None:
+            # Chunk yang masih in-flight belum tersimpan, jadi diingat di jendela dedup
+            chunk = dedup.filter_rows(chunk, window=max_in_flight + 1)
+        pending.append(pool.submit(score_csv_rows, chunk, first_row_number, engine))
+        if len(pending) >= max_in_flight:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+class _TeeRawReader(io.RawIOBase):
+    """Baca stream upload per chunk sambil menulis byte yang sama ke file tujuan dan menghitung hash-nya"""
+
+    def __init__(self, source, sink):
+        self.source = source
+        self.sink = sink
+        self.bytes_read = 0
+        self.digest = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.source.read(len(buffer))
+        if not data:
+            return 0
+        size = len(data)
+        buffer[:size] = data
+        self.sink.write(data)
+        self.digest.update(data)
+        self.bytes_read += size
+        return size
+
+def validate_csv_header(fieldnames):
+    """Raise ValueError jika kolom wajib tidak ada di header CSV"""
+    if not all(col in (fieldnames or []) for col in REQUIRED_COLUMNS):
+        raise ValueError(f"CSV must contain columns: {', '.join(REQUIRED_COLUMNS)}")
+
+def ingest_csv_stream(source, filepath, row_consumer=None):
+    """Simpan stream upload ke filepath sambil validasi header, hitung baris dan hash isi file.
+
+    Semua dilakukan dalam satu pass dengan buffer berukuran tetap
+    (CSV_STREAM_CHUNK_SIZE), jadi memori tidak tergantung ukuran file.
+    row_consumer(rows), jika diberikan, menerima iterator baris (dict) untuk
+    diproses langsung, misalnya scoring. Mengembalikan (jumlah baris data,
+    sha256 hex isi file).
+    """
+    row_count = 0
+
+    def counted(reader):
+        nonlocal row_count
+        for row in reader:
+            row_count += 1
+            yield row
+
+    with open(filepath, 'wb') as sink:
+        raw = _TeeRawReader(source, sink)
+        buffered = io.BufferedReader(raw, buffer_size=config.CSV_STREAM_CHUNK_SIZE)
+        text = io.TextIOWrapper(buffered, encoding=CSV_ENCODING, newline='')
+        reader = csv.DictReader(text)
+        validate_csv_header(reader.fieldnames)
+
+        rows = counted(reader)
+        if row_consumer is not None:
+            row_consumer(rows)
+        # Habiskan sisa stream supaya file tersimpan utuh
+        for _ in rows:
+            pass
+        # Sisa byte setelah baris terakhir (mis. newline) ikut di-hash dan disimpan
+        while buffered.read(config.CSV_STREAM_CHUNK_SIZE):
+            pass
+
+    return row_count, raw.digest.hexdigest()
@@ -0,0 +1,241 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+import mysql.connector
+from mysql.connector import errors, pooling
+from config import get_config
+from metrics_utils import record_stage
+
+config = get_config()
+
+# Database configuration using config
+db_config = {
+    'host': config.DB_HOST,
+    'port': config.DB_PORT,
+    'user': config.DB_USER,
+    'password': config.DB_PASSWORD,
+    'database': config.DB_NAME
+}
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_pool_stats = {
+    'checkouts': 0,
+    'in_use': 0,
+    'waits': 0,
+    'timeouts': 0,
+    'errors': 0
+}
+
+def get_pool():
+    """Pool koneksi per proses, dibuat saat pertama kali dipakai (setelah fork gunicorn)"""
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name=f"client_analysis_{os.getpid()}",
+                    pool_size=config.DB_POOL_SIZE,
+                    pool_reset_session=True,
+                    **db_config
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+def get_db_connection():
+    """Ambil koneksi dari pool; close() mengembalikannya ke pool.
+
+    Jika pool sedang habis, tunggu sampai DB_POOL_TIMEOUT detik.
+    """
+    pool = get_pool()
+    deadline = time.monotonic() + config.DB_POOL_TIMEOUT
+    waited = False
+    while True:
+        try:
+            conn = pool.get_connection()
+            break
+        except errors.PoolError:
+            if time.monotonic() >= deadline:
+                with _pool_lock:
+                    _pool_stats['timeouts'] += 1
+                raise
+            if not waited:
+                waited = True
+                with _pool_lock:
+                    _pool_stats['waits'] += 1
+            time.sleep(0.01)
+
+    with _pool_lock:
+        _pool_stats['checkouts'] += 1
+        _pool_stats['in_use'] += 1
+    return _TrackedConnection(conn)
+
+class _TrackedConnection:
+    """Wrapper tipis di atas PooledMySQLConnection untuk menghitung koneksi yang dipakai"""
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._returned = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def cursor(self, *args, **kwargs):
+        return _TimedCursor(self._conn.cursor(*args, **kwargs))
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            self._conn.commit()
+        finally:
+            record_stage('db', time.perf_counter() - started)
+
+    def rollback(self):
+        started = time.perf_counter()
+        try:
+            self._conn.rollback()
+        finally:
+            record_stage('db', time.perf_counter() - started)
+
+    def close(self):
+        if self._returned:
+            return
+        self._returned = True
+        try:
+            self._conn.close()
+        finally:
+            with _pool_lock:
+                _pool_stats['in_use'] -= 1
+
+class _TimedCursor:
+    """Wrapper cursor yang mencatat waktu execute/fetch sebagai stage 'db' di metrics"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            record_stage('db', time.perf_counter() - started)
+
+    def execute(self, *args):
+        return self._timed(self._cursor.execute, *args)
+
+    def executemany(self, *args):
+        return self._timed(self._cursor.executemany, *args)
+
+    def fetchone(self):
+        return self._timed(self._cursor.fetchone)
+
+    def fetchmany(self, *args):
+        return self._timed(self._cursor.fetchmany, *args)
+
+    def fetchall(self):
+        return self._timed(self._cursor.fetchall)
+
+@contextmanager
+def db_connection():
+    """Checkout koneksi dari pool dan selalu kembalikan, termasuk saat early return/exception"""
+    conn = get_db_connection()
+    try:
+        yield conn
+    except Exception:
+        with _pool_lock:
+            _pool_stats['errors'] += 1
+        try:
+            conn.rollback()
+        except mysql.connector.Error:
+            pass
+        raise
+    finally:
+        conn.close()
+
+def iter_query_chunks(conn, query, params=None, chunk_size=1000):
+    """Stream hasil query per fetchmany(chunk_size) dengan cursor unbuffered (server-side)"""
+    cursor = conn.cursor(buffered=False)
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        # Iterasi bisa berhenti di tengah jalan; buang sisa hasil supaya koneksi tetap bersih
+        conn.consume_results()
+        cursor.close()
+
+def _lock_name(name):
+    # GET_LOCK berlaku untuk seluruh server MySQL, jadi diberi prefix nama database
+    return f"{config.DB_NAME}.{name}"
+
+@contextmanager
+def named_lock(name):
+    """Lock MySQL (GET_LOCK) untuk job yang hanya boleh jalan satu di semua worker/proses.
+
+    Lock terikat ke sesi, jadi koneksinya dipegang sampai blok selesai dan
+    otomatis lepas jika proses mati. RuntimeError jika lock sedang dipegang.
+    """
+    conn = get_db_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (_lock_name(name),))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError(f"Job '{name}' is already running")
+        try:
+            yield
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (_lock_name(name),))
+            cursor.fetchone()
+        cursor.close()
+    finally:
+        conn.close()
+
+def lock_is_free(name):
+    """True jika tidak ada sesi yang memegang named_lock(name)"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT IS_FREE_LOCK(%s)", (_lock_name(name),))
+        free = cursor.fetchone()[0] == 1
+        cursor.close()
+    return free
+
+def bulk_update_by_id(cursor, table, columns, rows, chunk_size=1000):
+    """Update banyak baris sekaligus: UPDATE ... JOIN ke derived table (id, kolom...).
+
+    rows berisi tuple (id, nilai kolom...). Baris yang sudah dihapus tidak ikut
+    ter-join, jadi tidak muncul kembali seperti pada upsert per primary key.
+    """
+    rows = list(rows)
+    select = 'SELECT ' + ', '.join(['%s AS id'] + [f'%s AS {column}' for column in columns])
+    assignments = ', '.join(f't.{column} = v.{column}' for column in columns)
+    updated = 0
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        derived = select + ''.join(
+            ' UNION ALL SELECT ' + ', '.join(['%s'] * (len(columns) + 1)) for _ in chunk[1:]
+        )
+        cursor.execute(
+            f"UPDATE {table} t JOIN ({derived}) v ON v.id = t.id SET {assignments}",
+            [value for row in chunk for value in row]
+        )
+        updated += cursor.rowcount
+    return updated
+
+def pool_stats():
+    """Statistik pool koneksi untuk proses ini"""
+    with _pool_lock:
+        stats = dict(_pool_stats)
+    stats['pool_size'] = config.DB_POOL_SIZE
+    stats['initialized'] = _pool is not None and _pool_pid == os.getpid()
+    return stats
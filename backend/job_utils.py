@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from config import get_config
+
+config = get_config()
+
+# Riwayat job yang disimpan di memori per proses
+MAX_JOB_HISTORY = 200
+
+_executor = None
+_executor_pid = None
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+def get_executor():
+    """Thread pool per proses untuk job background (dibuat ulang setelah fork)"""
+    global _executor, _executor_pid
+    with _jobs_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=config.BACKGROUND_WORKERS,
+                thread_name_prefix='background-job'
+            )
+            _executor_pid = os.getpid()
+    return _executor
+
+def submit_job(func, *args, job_type='job', meta=None):
+    """Jalankan func(*args) di background dan kembalikan job id"""
+    job_id = uuid.uuid4().hex
+    job = {
+        'job_id': job_id,
+        'type': job_type,
+        'status': 'queued',
+        'submitted_at': time.time(),
+        'started_at': None,
+        'finished_at': None,
+        'result': None,
+        'error': None
+    }
+    job.update(meta or {})
+
+    with _jobs_lock:
+        _jobs[job_id] = job
+        if len(_jobs) > MAX_JOB_HISTORY:
+            finished = [j for j in _jobs.values() if j['finished_at'] is not None]
+            for old_job in sorted(finished, key=lambda j: j['finished_at'])[:len(_jobs) - MAX_JOB_HISTORY]:
+                del _jobs[old_job['job_id']]
+
+    get_executor().submit(_run_job, job, func, args)
+    return job_id
+
+def _run_job(job, func, args):
+    job['status'] = 'running'
+    job['started_at'] = time.time()
+    try:
+        job['result'] = func(*args)
+        job['status'] = 'completed'
+    except Exception as e:
+        job['status'] = 'failed'
+        job['error'] = str(e)
+        traceback.print_exc()
+    finally:
+        job['finished_at'] = time.time()
+
+def get_job(job_id):
+    """Info job (hanya untuk job yang dijalankan proses ini)"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job) if job else None
+
+def latest_job(job_type):
+    """Job terbaru dengan tipe tertentu di proses ini"""
+    with _jobs_lock:
+        jobs = [job for job in _jobs.values() if job['type'] == job_type]
+        if not jobs:
+            return None
+        return dict(max(jobs, key=lambda job: job['submitted_at']))
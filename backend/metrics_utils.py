@@ -0,0 +1,156 @@
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from flask import g, has_request_context, request
+
+# Metrics disimpan per proses (per worker gunicorn)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+METRIC_DEFINITIONS = {
+    'http_requests_total': ('counter', 'Jumlah request per route, method dan status'),
+    'http_request_duration_seconds': ('histogram', 'Latency request per route'),
+    'http_request_stage_seconds_total': ('counter', 'Waktu DB vs compute per route'),
+    'app_stage_duration_seconds': ('histogram', 'Durasi tiap operasi DB / blok compute'),
+    'csv_rows_processed_total': ('counter', 'Baris CSV yang sudah di-score dan disimpan'),
+    'csv_processing_seconds_total': ('counter', 'Total waktu processing CSV'),
+    'csv_processing_rows_per_second': ('gauge', 'Throughput processing CSV terakhir'),
+    'clients_ingested_total': ('counter', 'Klien yang disimpan lewat bulk import')
+}
+
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_gauges = {}
+_histograms = {}
+_thread_stages = threading.local()
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+def inc(name, value=1, labels=None):
+    with _lock:
+        _counters[_key(name, labels)] += value
+
+def set_gauge(name, value, labels=None):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+def observe(name, value, labels=None):
+    key = _key(name, labels)
+    index = bisect.bisect_left(LATENCY_BUCKETS, value)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+        histogram[0][index] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+def record_stage(stage, seconds):
+    """Catat durasi stage ('db' atau 'compute'); di dalam request juga dijumlahkan per route"""
+    observe('app_stage_duration_seconds', seconds, {'stage': stage})
+    totals = getattr(_thread_stages, 'totals', None)
+    if totals is None:
+        totals = _thread_stages.totals = defaultdict(float)
+    totals[stage] += seconds
+    if has_request_context():
+        stage_seconds = g.setdefault('stage_seconds', defaultdict(float))
+        stage_seconds[stage] += seconds
+
+def thread_stage_seconds(stage):
+    """Total durasi stage yang sudah dicatat di thread ini (untuk mengurangi waktu nested)"""
+    return getattr(_thread_stages, 'totals', {}).get(stage, 0.0)
+
+@contextmanager
+def stage_timer(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+def init_app(app):
+    """Pasang hook latency per route di app Flask"""
+
+    @app.before_request
+    def _start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        observe('http_request_duration_seconds', time.perf_counter() - started,
+                {'route': route, 'method': request.method})
+        inc('http_requests_total', labels={
+            'route': route, 'method': request.method, 'status': str(response.status_code)
+        })
+        for stage, seconds in g.pop('stage_seconds', {}).items():
+            inc('http_request_stage_seconds_total', seconds, {'route': route, 'stage': stage})
+        return response
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in items) + '}'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value):
+    if isinstance(value, bool):
+        value = int(value)
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_metrics(extra_metrics=None):
+    """Semua metrics dalam format teks Prometheus (exposition format 0.0.4).
+
+    extra_metrics: {nama: (help, nilai atau {label tuple: nilai}[, tipe])} untuk
+    nilai yang dibaca saat scrape, misalnya statistik pool dan cache. Tipe
+    default 'gauge'; nilai yang hanya naik sejak worker start pakai 'counter'.
+    """
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        histograms = {key: (list(h[0]), h[1], h[2]) for key, h in _histograms.items()}
+
+    by_name = defaultdict(list)
+    for (name, labels), value in list(counters.items()) + list(gauges.items()):
+        by_name[name].append((labels, value))
+
+    lines = []
+    for name, (metric_type, help_text) in METRIC_DEFINITIONS.items():
+        if metric_type == 'histogram':
+            series = [(labels, h) for (n, labels), h in histograms.items() if n == name]
+        else:
+            series = by_name.get(name, [])
+        if not series:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for labels, value in sorted(series, key=lambda item: item[0]):
+            if metric_type != 'histogram':
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                continue
+            bucket_counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip(list(LATENCY_BUCKETS) + ['+Inf'], bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+    for name, (help_text, value, *metric_type) in (extra_metrics or {}).items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type[0] if metric_type else 'gauge'}")
+        values = value if isinstance(value, dict) else {(): value}
+        for labels, series_value in values.items():
+            if series_value is None:
+                continue
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(series_value)}")
+
+    return '\n'.join(lines) + '\n'
@@ -1,84 +1,102 @@
-import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-import joblib
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import namedtuple
 from config import get_config
 
 config = get_config()
 
-def train_initial_models():
-    """Train initial models dengan data yang lebih realistis dan variatif"""
-    np.random.seed(42)
-    n_samples = 2000  # More samples for better accuracy
-    
-    # Realistic data distributions for Indonesian market
+ModelBundle = namedtuple('ModelBundle', ['model', 'scaler', 'kmeans', 'version'])
+
+# Layout versi di MODELS_DIR: <versi>/<file artifact> + file CURRENT berisi nama versi aktif
+ARTIFACT_FILENAMES = {
+    'model': 'potensi_model.joblib',
+    'scaler': 'scaler.joblib',
+    'kmeans': 'kmeans_model.joblib'
+}
+CURRENT_POINTER = 'CURRENT'
+
+# Parameter distribusi data sintetis (realistis untuk pasar Indonesia)
+SYNTHETIC_DATA_PARAMS = {
     # Frekuensi transaksi (Poisson distribution, mean 12)
-    frekuensi = np.random.poisson(12, n_samples)
-    frekuensi = np.clip(frekuensi, 1, 50)
-    
-    # Nilai transaksi (Log-normal distribution for Indonesian business)
-    nilai_transaksi = np.random.lognormal(13.5, 1.0, n_samples)  # Mean around 1.5-2 juta
-    nilai_transaksi = np.clip(nilai_transaksi, 500000, 10000000)  # 500rb - 10 juta
-    
-    # Lama usaha (Gamma distribution)
-    lama_usaha = np.random.gamma(2.5, 10, n_samples)  # Mean around 2.5 years
-    lama_usaha = np.clip(lama_usaha, 3, 120)  # 3 bulan - 10 tahun
-    
-    # Luas area (Normal distribution)
-    luas_area = np.random.normal(75, 30, n_samples)  # Mean 75m², std 30
-    luas_area = np.clip(luas_area, 10, 300)  # 10-300 m²
-    
+    'frekuensi': {'lam': 12, 'clip': (1, 50)},
+    # Nilai transaksi (Log-normal, mean around 1.5-2 juta), 500rb - 10 juta
+    'nilai_transaksi': {'mean': 13.5, 'sigma': 1.0, 'clip': (500000, 10000000)},
+    # Lama usaha dalam bulan (Gamma, mean around 2.5 years), 3 bulan - 10 tahun
+    'lama_usaha': {'shape': 2.5, 'scale': 10, 'clip': (3, 120)},
+    # Luas area (Normal, mean 75m², std 30), 10-300 m²
+    'luas_area': {'loc': 75, 'scale': 30, 'clip': (10, 300)},
     # Location features (Categorical distributions)
-    potensi_lokasi = np.random.choice([4, 5, 6, 7, 8, 9], n_samples, 
-                                    p=[0.15, 0.20, 0.25, 0.20, 0.15, 0.05])
-    
-    kepadatan = np.random.choice([5, 6, 7, 8, 9], n_samples, 
-                               p=[0.20, 0.25, 0.25, 0.20, 0.10])
-    
-    daya_beli = np.random.choice([5, 6, 7, 8, 9], n_samples, 
-                               p=[0.20, 0.25, 0.25, 0.20, 0.10])
-    
+    'potensi_lokasi': {'values': [4, 5, 6, 7, 8, 9], 'p': [0.15, 0.20, 0.25, 0.20, 0.15, 0.05]},
+    'kepadatan': {'values': [5, 6, 7, 8, 9], 'p': [0.20, 0.25, 0.25, 0.20, 0.10]},
+    'daya_beli': {'values': [5, 6, 7, 8, 9], 'p': [0.20, 0.25, 0.25, 0.20, 0.10]},
+    # Bobot fitur ternormalisasi untuk skor dasar
+    'weights': [0.25, 0.25, 0.15, 0.10, 0.08, 0.07, 0.10],
+    'noise_std': 8,
+    # Bonus aturan bisnis: (kolom X, operator, batas, bonus). Tier "> 5 juta: +12" dan
+    # "> 60 bulan: +8" dari versi lama tidak pernah kena (elif setelah kondisi yang lebih
+    # longgar), jadi tidak dicantumkan agar hasil tetap sama.
+    'bonuses': [
+        (1, '>', 2, 8),    # nilai transaksi di atas 2 juta
+        (2, '>', 36, 5),   # usaha lebih dari 3 tahun
+        (4, '>=', 8, 6)    # lokasi potensi tinggi
+    ]
+}
+
+def generate_training_data(n_samples=2000, seed=42, params=None):
+    """Generate data training sintetis (X, y) secara vektor; cepat untuk jutaan baris.
+
+    params meng-override sebagian SYNTHETIC_DATA_PARAMS. Dengan parameter
+    default, hasil identik dengan generator lama untuk seed yang sama.
+    """
+    params = {**SYNTHETIC_DATA_PARAMS, **(params or {})}
+    rng = np.random.RandomState(seed)
+
+    p = params['frekuensi']
+    frekuensi = np.clip(rng.poisson(p['lam'], n_samples), *p['clip'])
+    p = params['nilai_transaksi']
+    nilai_transaksi = np.clip(rng.lognormal(p['mean'], p['sigma'], n_samples), *p['clip'])
+    p = params['lama_usaha']
+    lama_usaha = np.clip(rng.gamma(p['shape'], p['scale'], n_samples), *p['clip'])
+    p = params['luas_area']
+    luas_area = np.clip(rng.normal(p['loc'], p['scale'], n_samples), *p['clip'])
+    potensi_lokasi, kepadatan, daya_beli = (
+        rng.choice(params[name]['values'], n_samples, p=params[name]['p'])
+        for name in ('potensi_lokasi', 'kepadatan', 'daya_beli')
+    )
+
     # Combine features
-    X = np.column_stack([frekuensi, nilai_transaksi/1000000, lama_usaha, luas_area, 
+    X = np.column_stack([frekuensi, nilai_transaksi/1000000, lama_usaha, luas_area,
                         potensi_lokasi, kepadatan, daya_beli])
-    
-    # Calculate realistic target scores using weighted formula
-    weights = np.array([0.25, 0.25, 0.15, 0.10, 0.08, 0.07, 0.10])
-    
-    # Normalize each feature to 0-1 scale
-    X_normalized = np.zeros_like(X)
-    for i in range(X.shape[1]):
-        X_normalized[:, i] = (X[:, i] - X[:, i].min()) / (X[:, i].max() - X[:, i].min())
-    
-    # Calculate base score
-    y_base = np.dot(X_normalized, weights) * 100
-    
+
+    # Normalize each feature to 0-1 scale, lalu skor dasar berbobot
+    X_min = X.min(axis=0)
+    X_normalized = (X - X_min) / (X.max(axis=0) - X_min)
+    y = np.dot(X_normalized, np.array(params['weights'])) * 100
+
     # Add realistic noise and variations
-    noise = np.random.normal(0, 8, n_samples)  # Realistic noise
-    y = y_base + noise
-    
+    y = y + rng.normal(0, params['noise_std'], n_samples)
+
     # Apply business rules simulation
-    for i in range(n_samples):
-        # Bonus for high transaction value
-        if X[i, 1] > 2:  # Above 2 juta
-            y[i] += 8
-        elif X[i, 1] > 5:  # Above 5 juta
-            y[i] += 12
-        
-        # Bonus for established business
-        if X[i, 2] > 36:  # More than 3 years
-            y[i] += 5
-        elif X[i, 2] > 60:  # More than 5 years
-            y[i] += 8
-        
-        # Bonus for premium location
-        if X[i, 4] >= 8:  # High potential location
-            y[i] += 6
-    
+    for column, operator, threshold, bonus in params['bonuses']:
+        hit = X[:, column] >= threshold if operator == '>=' else X[:, column] > threshold
+        y += np.where(hit, bonus, 0)
+
     # Ensure scores are within 0-100 range
-    y = np.clip(y, 0, 100)
+    return X, np.clip(y, 0, 100)
+
+def train_initial_models(n_samples=2000, seed=42):
+    """Train initial models dengan data yang lebih realistis dan variatif"""
+    # sklearn baru di-import saat training supaya start-up worker tetap cepat
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+    X, y = generate_training_data(n_samples, seed)
     
     # Scale features
     scaler = StandardScaler()
@@ -92,7 +110,8 @@ def train_initial_models():
         min_samples_split=4,
         min_samples_leaf=2,
         max_features=0.8,
-        bootstrap=True
+        bootstrap=True,
+        n_jobs=-1
     )
     
     model.fit(X_scaled, y)
@@ -102,9 +121,7 @@ def train_initial_models():
     kmeans.fit(X_scaled)
     
     # Save models
-    joblib.dump(model, config.MODEL_PATH)
-    joblib.dump(scaler, config.SCALER_PATH)
-    joblib.dump(kmeans, config.KMEANS_PATH)
+    save_model_artifacts(model, scaler, kmeans)
     
     # Calculate and print model performance
     train_score = model.score(X_scaled, y)
@@ -131,4 +148,266 @@ def get_recommendation_category(score, segment):
     elif score >= 60:
         return "Prioritas Menengah - Campaign Khusus"
     else:
-        return "Prioritas Standar - Nurturing"
\ No newline at end of file
+        return "Prioritas Standar - Nurturing"
+
+def rows_to_matrix(rows):
+    """Ubah baris hasil query (tuple, bisa berisi None/Decimal) menjadi matrix float32; None menjadi NaN"""
+    values = np.array(rows, dtype=object)
+    values[values == None] = np.nan  # noqa: E711 (perbandingan elementwise)
+    return values.astype(np.float32)
+
+class ReservoirSampler:
+    """Kumpulkan baris training ke matrix float32 yang dialokasikan di depan.
+
+    Sampai max_rows semua baris disimpan; setelah itu reservoir sampling
+    (algoritma R) menjaga sampel acak seragam berukuran max_rows, jadi memori
+    tidak tergantung jumlah data di database.
+    """
+
+    def __init__(self, n_columns, max_rows, expected_rows=None, seed=42):
+        self.max_rows = max_rows
+        capacity = min(max_rows, expected_rows) if expected_rows else max_rows
+        self._data = np.empty((max(capacity, 1), n_columns), dtype=np.float32)
+        self.filled = 0
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+
+    def add(self, chunk):
+        # Isi slot yang masih kosong (perbesar buffer jika perkiraan jumlah baris terlalu kecil)
+        take = min(len(chunk), self.max_rows - self.filled)
+        if take:
+            if self.filled + take > len(self._data):
+                new_capacity = min(max(len(self._data) * 2, self.filled + take), self.max_rows)
+                self._data = np.resize(self._data, (new_capacity, self._data.shape[1]))
+            self._data[self.filled:self.filled + take] = chunk[:take]
+            self.filled += take
+            self.seen += take
+
+        rest = chunk[take:]
+        if len(rest):
+            # Baris ke-t (0-based) menggantikan slot acak j < max_rows dengan peluang max_rows/(t+1)
+            positions = np.arange(self.seen, self.seen + len(rest))
+            slots = (self._rng.random(len(rest)) * (positions + 1)).astype(np.int64)
+            keep = slots < self.max_rows
+            self._data[slots[keep]] = rest[keep]
+            self.seen += len(rest)
+
+    @property
+    def matrix(self):
+        return self._data[:self.filled]
+
+def train_models_from_chunks(open_chunks, n_columns, max_rows, expected_rows=None, n_clusters=4):
+    """Latih scaler/RandomForest/KMeans dari data yang di-stream per chunk.
+
+    open_chunks() harus mengembalikan iterator baru atas chunk matrix float32
+    (kolom fitur lalu kolom target). Scaler di-fit dengan partial_fit atas
+    semua baris, RandomForest dari reservoir sample (maks max_rows baris).
+    Jika data lebih besar dari sampel, clustering memakai
+    MiniBatchKMeans.partial_fit pada pass kedua atas semua data.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.preprocessing import StandardScaler
+    scaler = StandardScaler()
+    sampler = ReservoirSampler(n_columns, max_rows, expected_rows)
+    for chunk in open_chunks():
+        scaler.partial_fit(chunk[:, :-1])
+        sampler.add(chunk)
+
+    data = sampler.matrix
+    if sampler.seen == 0:
+        raise ValueError('No training data available')
+    X_scaled = scaler.transform(data[:, :-1])
+    y = data[:, -1]
+
+    model = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+    model.fit(X_scaled, y)
+
+    if sampler.seen > len(data):
+        kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3)
+        for chunk in open_chunks():
+            if len(chunk) >= n_clusters:
+                kmeans.partial_fit(scaler.transform(chunk[:, :-1]))
+    else:
+        kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+        kmeans.fit(X_scaled)
+
+    info = {
+        'rows_seen': sampler.seen,
+        'samples_used': len(data),
+        'model_score': model.score(X_scaled, y),
+        'kmeans': type(kmeans).__name__
+    }
+    return model, scaler, kmeans, info
+
+def legacy_artifact_paths():
+    """Path artifact lama (MODEL_PATH dkk.), dipakai jika belum ada versi di MODELS_DIR"""
+    return {
+        'model': config.MODEL_PATH,
+        'scaler': config.SCALER_PATH,
+        'kmeans': config.KMEANS_PATH
+    }
+
+def version_artifact_paths(version):
+    directory = os.path.join(config.MODELS_DIR, version)
+    return {name: os.path.join(directory, filename) for name, filename in ARTIFACT_FILENAMES.items()}
+
+def read_current_version():
+    """Nama versi yang ditunjuk pointer CURRENT; None jika belum ada"""
+    try:
+        with open(os.path.join(config.MODELS_DIR, CURRENT_POINTER)) as f:
+            version = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+def list_model_versions():
+    """Versi artifact yang tersimpan di MODELS_DIR, terlama dulu"""
+    if not os.path.isdir(config.MODELS_DIR):
+        return []
+    return sorted(
+        name for name in os.listdir(config.MODELS_DIR)
+        if not name.endswith('.tmp') and os.path.isdir(os.path.join(config.MODELS_DIR, name))
+    )
+
+def save_model_artifacts(model, scaler, kmeans, metadata=None):
+    """Simpan artifact sebagai versi baru di MODELS_DIR lalu pindahkan pointer CURRENT secara atomik.
+
+    File versi lama tidak pernah ditimpa, jadi worker yang masih memakainya
+    (lewat mmap) tidak terganggu. Tanpa kompresi supaya bisa di-load dengan
+    mmap_mode. Mengembalikan nama versi baru.
+    """
+    import joblib
+    version = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    directory = os.path.join(config.MODELS_DIR, version)
+    tmp_directory = f"{directory}.tmp"
+    os.makedirs(tmp_directory)
+
+    for name, obj in (('model', model), ('scaler', scaler), ('kmeans', kmeans)):
+        joblib.dump(obj, os.path.join(tmp_directory, ARTIFACT_FILENAMES[name]))
+    with open(os.path.join(tmp_directory, 'metadata.json'), 'w') as f:
+        json.dump(dict(metadata or {}, version=version, created_at=time.time()), f)
+    os.rename(tmp_directory, directory)
+
+    pointer_path = os.path.join(config.MODELS_DIR, CURRENT_POINTER)
+    tmp_pointer_path = f"{pointer_path}.tmp-{os.getpid()}"
+    with open(tmp_pointer_path, 'w') as f:
+        f.write(version)
+    os.replace(tmp_pointer_path, pointer_path)
+
+    prune_model_versions()
+    return version
+
+def prune_model_versions(keep=None):
+    """Hapus versi terlama di luar MODEL_KEEP_VERSIONS (versi aktif tidak pernah dihapus)"""
+    keep = config.MODEL_KEEP_VERSIONS if keep is None else keep
+    current = read_current_version()
+    versions = [version for version in list_model_versions() if version != current]
+    for version in versions[:max(len(versions) - (keep - 1), 0)]:
+        shutil.rmtree(os.path.join(config.MODELS_DIR, version), ignore_errors=True)
+
+def _rss_bytes():
+    """Resident set size proses ini (Linux); None jika tidak tersedia"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+class ModelRegistry:
+    """Load model/scaler/kmeans sekali per proses dan ganti secara atomik saat versi berubah.
+
+    Versi aktif dibaca dari pointer CURRENT di MODELS_DIR (fallback ke
+    MODEL_PATH dkk. untuk instalasi lama). Artifact di-load dengan mmap_mode,
+    tapi hanya array numpy biasa (scaler, pusat cluster KMeans) yang tetap
+    berupa memmap; node pohon RandomForest di-copy ke memori proses saat
+    unpickle (diukur: file 182 MB -> RSS +180 MB, 0 dari 100 pohon memmap).
+    Penghematan memori antar worker untuk model datang dari load sebelum
+    fork (gunicorn --preload) yang berbagi page copy-on-write, bukan mmap.
+    """
+
+    def __init__(self, mmap_mode='r'):
+        self.mmap_mode = mmap_mode
+        self._bundle = None
+        self._info = {}
+        self._loads = 0
+        self._last_error = None
+        self._lock = threading.Lock()
+
+    def resolve(self):
+        """(versi, paths) artifact aktif; (None, None) jika belum ada model"""
+        version = read_current_version()
+        if version is not None:
+            return version, version_artifact_paths(version)
+
+        paths = legacy_artifact_paths()
+        try:
+            stats = [os.stat(paths[name]) for name in ('model', 'scaler', 'kmeans')]
+        except FileNotFoundError:
+            return None, None
+        key = '|'.join(f"{s.st_ino}:{s.st_mtime_ns}:{s.st_size}" for s in stats)
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()[:12], paths
+
+    def artifact_version(self):
+        return self.resolve()[0]
+
+    def available(self):
+        return self.artifact_version() is not None
+
+    def get(self):
+        """ModelBundle untuk versi artifact terbaru (load hanya jika versi berubah)"""
+        version, paths = self.resolve()
+        bundle = self._bundle
+        if bundle is not None and (version is None or bundle.version == version):
+            return bundle
+        if version is None:
+            raise FileNotFoundError('Model artifacts not found, train the models first')
+
+        with self._lock:
+            if self._bundle is None or self._bundle.version != version:
+                try:
+                    self._load(version, paths)
+                except Exception as e:
+                    # Artifact baru gagal di-load: tetap pakai versi lama jika ada
+                    self._last_error = str(e)
+                    if self._bundle is None:
+                        raise
+                    print(f"Model reload failed, keeping version {self._bundle.version}: {str(e)}")
+            return self._bundle
+
+    def _load(self, version, paths):
+        import joblib
+        rss_before = _rss_bytes()
+        started = time.perf_counter()
+        objects = {
+            name: joblib.load(path, mmap_mode=self.mmap_mode)
+            for name, path in paths.items()
+        }
+        load_seconds = time.perf_counter() - started
+        rss_after = _rss_bytes()
+
+        # Satu assignment: request lain melihat bundle lama atau baru, tidak pernah campuran
+        self._bundle = ModelBundle(objects['model'], objects['scaler'], objects['kmeans'], version)
+        self._loads += 1
+        self._last_error = None
+        self._info = {
+            'version': version,
+            'loaded_at': time.time(),
+            'load_seconds': round(load_seconds, 4),
+            'artifact_bytes': sum(os.path.getsize(path) for path in paths.values()),
+            'resident_bytes': (max(rss_after - rss_before, 0)
+                               if rss_before is not None and rss_after is not None else None)
+        }
+
+    def stats(self):
+        with self._lock:
+            info = dict(self._info)
+            info['loaded'] = self._bundle is not None
+            info['loads'] = self._loads
+            info['last_error'] = self._last_error
+        info['available_version'] = self.artifact_version()
+        info['mmap_mode'] = self.mmap_mode
+        info['process_rss_bytes'] = _rss_bytes()
+        return info
+
+MODEL_REGISTRY = ModelRegistry()
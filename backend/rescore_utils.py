@@ -0,0 +1,152 @@
+from collections import defaultdict
+from config import get_config
+from db_utils import bulk_update_by_id
+from scoring_utils import score_clients_batch
+from summary_utils import SCOPE_CLIENTS, SCOPE_CSV_UPLOAD, replace_summary_rows
+
+config = get_config()
+
+# Baris hasil yang scoring_version-nya tidak sama dengan versi target dianggap usang.
+# Query memakai keyset (id > last_id) sehingga tiap batch hanya membaca baris usang berikutnya.
+STALE_CLIENT_RESULTS_QUERY = """
+    SELECT a.id, f.id, c.kategori_usaha, c.lokasi, c.rating, c.jumlah_ulasan,
+           a.skor_potensi, a.prioritas, a.segmentasi
+    FROM analysis_results a
+    JOIN clients c ON c.id = a.client_id
+    LEFT JOIN features f ON f.client_id = a.client_id
+    WHERE a.id > %s AND (a.scoring_version IS NULL OR a.scoring_version <> %s)
+    ORDER BY a.id
+    LIMIT %s
+"""
+
+STALE_CSV_RESULTS_QUERY = """
+    SELECT id, upload_id, business_category, location, rating, jumlah_ulasan,
+           potential_score, priority, segmentation
+    FROM csv_analysis_results
+    WHERE id > %s AND (scoring_version IS NULL OR scoring_version <> %s)
+    ORDER BY id
+    LIMIT %s
+"""
+
+# Kolom yang ditulis ulang per tabel; dikirim lewat bulk_update_by_id (UPDATE ... JOIN)
+# sehingga baris yang terhapus selama rescoring tidak dibuat ulang
+CLIENT_RESULTS_RESCORE_COLUMNS = ('skor_potensi', 'segmentasi', 'prioritas', 'kategori_rekomendasi', 'scoring_version')
+FEATURES_RESCORE_COLUMNS = ('potensi_bisnis_lokasi', 'kepadatan_penduduk', 'daya_beli_lokasi')
+CSV_RESULTS_RESCORE_COLUMNS = ('potential_score', 'segmentation', 'priority', 'recommendation_category', 'scoring_version')
+
+def count_stale_results(cursor, version):
+    """Jumlah baris hasil yang belum di-score dengan versi ini, per tabel"""
+    counts = {}
+    for name, table in (('clients', 'analysis_results'), ('csv', 'csv_analysis_results')):
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE scoring_version IS NULL OR scoring_version <> %s",
+            (version,)
+        )
+        counts[name] = int(cursor.fetchone()[0])
+    return counts
+
+def _fetch_stale(cursor, query, last_id, version, batch_size):
+    cursor.execute(query, (last_id, version, batch_size))
+    return cursor.fetchall()
+
+def score_stored_rows(rows, engine=None):
+    """Score baris (id, ..., kategori, lokasi, rating, ulasan, ...) hasil query stale"""
+    return score_clients_batch([
+        {
+            'kategori_usaha': row[2] or '',
+            'lokasi': row[3] or '',
+            'rating': row[4] or 0,
+            'jumlah_ulasan': row[5] or 0
+        }
+        for row in rows
+    ], engine)
+
+def rescore_client_results(conn, cursor, version, engine=None, batch_size=None):
+    """Score ulang analysis_results (+ fitur lokasi) yang versinya usang, satu transaksi per batch"""
+    batch_size = batch_size or config.RESCORE_BATCH_SIZE
+    last_id, rescored = 0, 0
+    while True:
+        rows = _fetch_stale(cursor, STALE_CLIENT_RESULTS_QUERY, last_id, version, batch_size)
+        if not rows:
+            return rescored
+        scored = score_stored_rows(rows, engine)
+
+        bulk_update_by_id(cursor, 'analysis_results', CLIENT_RESULTS_RESCORE_COLUMNS, [
+            (row[0], skor, segmentasi, prioritas, rekomendasi, version)
+            for row, skor, segmentasi, prioritas, rekomendasi in zip(
+                rows, scored['skor_potensi'].tolist(), scored['segmentasi'].tolist(),
+                scored['prioritas'].tolist(), scored['kategori_rekomendasi'].tolist())
+        ])
+        features = [
+            (row[1], potensi, kepadatan, daya_beli)
+            for row, potensi, kepadatan, daya_beli in zip(
+                rows, scored['potensi_bisnis_lokasi'].tolist(),
+                scored['kepadatan_penduduk'].tolist(), scored['daya_beli_lokasi'].tolist())
+            if row[1] is not None
+        ]
+        if features:
+            bulk_update_by_id(cursor, 'features', FEATURES_RESCORE_COLUMNS, features)
+        replace_summary_rows(
+            cursor, SCOPE_CLIENTS, 0,
+            [row[6:9] for row in rows],
+            zip(scored['skor_potensi'].tolist(), scored['prioritas'].tolist(), scored['segmentasi'].tolist())
+        )
+        conn.commit()
+
+        rescored += len(rows)
+        last_id = rows[-1][0]
+
+def rescore_csv_results(conn, cursor, version, engine=None, batch_size=None):
+    """Score ulang csv_analysis_results yang versinya usang tanpa membaca ulang file CSV.
+
+    Mengembalikan (jumlah baris, set upload_id yang tersentuh).
+    """
+    batch_size = batch_size or config.RESCORE_BATCH_SIZE
+    last_id, rescored = 0, 0
+    upload_ids = set()
+    while True:
+        rows = _fetch_stale(cursor, STALE_CSV_RESULTS_QUERY, last_id, version, batch_size)
+        if not rows:
+            return rescored, upload_ids
+        scored = score_stored_rows(rows, engine)
+
+        bulk_update_by_id(cursor, 'csv_analysis_results', CSV_RESULTS_RESCORE_COLUMNS, [
+            (row[0], skor, segmentasi, prioritas, rekomendasi, version)
+            for row, skor, segmentasi, prioritas, rekomendasi in zip(
+                rows, scored['skor_potensi'].tolist(), scored['segmentasi'].tolist(),
+                scored['prioritas'].tolist(), scored['kategori_rekomendasi'].tolist())
+        ])
+
+        # Ringkasan per upload diperbarui dengan selisih lama -> baru
+        old_by_upload, new_by_upload = defaultdict(list), defaultdict(list)
+        for row, skor, prioritas, segmentasi in zip(
+                rows, scored['skor_potensi'].tolist(), scored['prioritas'].tolist(),
+                scored['segmentasi'].tolist()):
+            old_by_upload[row[1]].append(row[6:9])
+            new_by_upload[row[1]].append((skor, prioritas, segmentasi))
+        for upload_id in old_by_upload:
+            if upload_id is not None:
+                replace_summary_rows(cursor, SCOPE_CSV_UPLOAD, upload_id,
+                                     old_by_upload[upload_id], new_by_upload[upload_id])
+        conn.commit()
+
+        upload_ids.update(upload_id for upload_id in old_by_upload if upload_id is not None)
+        rescored += len(rows)
+        last_id = rows[-1][0]
+
+def mark_uploads_current(conn, cursor, upload_ids, version):
+    """Stamp versi di csv_uploads yang semua barisnya sudah current (dipakai dedup upload)"""
+    upload_ids = sorted(upload_ids)
+    for start in range(0, len(upload_ids), 1000):
+        chunk = upload_ids[start:start + 1000]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cursor.execute(f"""
+            UPDATE csv_uploads u SET scoring_version = %s
+            WHERE u.id IN ({placeholders}) AND u.status = 'completed'
+              AND NOT EXISTS (
+                  SELECT 1 FROM csv_analysis_results r
+                  WHERE r.upload_id = u.id
+                    AND (r.scoring_version IS NULL OR r.scoring_version <> %s)
+              )
+        """, [version] + chunk + [version])
+    conn.commit()
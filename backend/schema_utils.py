@@ -0,0 +1,109 @@
+from config import get_config
+from db_utils import db_connection
+
+config = get_config()
+
+# Perubahan skema setelah dump awal digital_marketing.sql. Setiap item dicek lewat
+# information_schema sebelum dijalankan, jadi migrasi aman diulang (idempotent).
+SCHEMA_TABLES = {
+    'analysis_summary': """
+        CREATE TABLE IF NOT EXISTS `analysis_summary` (
+          `scope` varchar(20) NOT NULL,
+          `scope_id` int NOT NULL DEFAULT '0',
+          `dimension` varchar(20) NOT NULL,
+          `bucket` varchar(100) NOT NULL,
+          `row_count` int NOT NULL DEFAULT '0',
+          `score_sum` bigint NOT NULL DEFAULT '0',
+          `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+          PRIMARY KEY (`scope`,`scope_id`,`dimension`,`bucket`)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+    """,
+}
+
+SCHEMA_COLUMNS = [
+    ('analysis_results', 'scoring_version', "varchar(32) DEFAULT NULL AFTER `kategori_rekomendasi`"),
+    ('csv_analysis_results', 'lead_fingerprint', "char(32) DEFAULT NULL AFTER `recommendation_category`"),
+    ('csv_analysis_results', 'scoring_version', "varchar(32) DEFAULT NULL AFTER `lead_fingerprint`"),
+    ('csv_uploads', 'duplicate_rows', "int DEFAULT '0' AFTER `processed_rows`"),
+    ('csv_uploads', 'content_hash', "char(64) DEFAULT NULL AFTER `status`"),
+    ('csv_uploads', 'scoring_version', "varchar(32) DEFAULT NULL AFTER `content_hash`"),
+    ('csv_uploads', 'processing_token', "char(32) DEFAULT NULL AFTER `scoring_version`"),
+]
+
+SCHEMA_INDEXES = [
+    ('analysis_results', 'skor_potensi_client', '`skor_potensi`,`client_id`'),
+    ('clients', 'created_at', '`created_at`'),
+    ('csv_analysis_results', 'upload_score', '`upload_id`,`potential_score`'),
+    ('csv_analysis_results', 'upload_priority_score', '`upload_id`,`priority`,`potential_score`'),
+    ('csv_analysis_results', 'lead_fingerprint', '`lead_fingerprint`'),
+    ('csv_uploads', 'content_hash', '`content_hash`'),
+]
+
+def _existing(cursor, query):
+    cursor.execute(query)
+    return {tuple(row) for row in cursor.fetchall()}
+
+def missing_schema(cursor):
+    """Daftar (jenis, nama, DDL) perubahan skema yang belum ada di database"""
+    tables = {row[0] for row in _existing(cursor,
+        "SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE()")}
+    columns = _existing(cursor,
+        "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = DATABASE()")
+    indexes = _existing(cursor,
+        "SELECT DISTINCT table_name, index_name FROM information_schema.statistics WHERE table_schema = DATABASE()")
+
+    missing = []
+    for table, ddl in SCHEMA_TABLES.items():
+        if table not in tables:
+            missing.append(('table', table, ddl))
+    for table, column, definition in SCHEMA_COLUMNS:
+        if (table, column) not in columns:
+            missing.append(('column', f'{table}.{column}',
+                            f"ALTER TABLE `{table}` ADD COLUMN `{column}` {definition}"))
+    for table, index, index_columns in SCHEMA_INDEXES:
+        if (table, index) not in indexes:
+            missing.append(('index', f'{table}.{index}',
+                            f"CREATE INDEX `{index}` ON `{table}` ({index_columns})"))
+    return missing
+
+def migrate_schema():
+    """Jalankan perubahan skema yang belum ada; mengembalikan nama item yang diterapkan"""
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        # Urutan missing_schema: tabel, kolom, lalu index yang bergantung pada kolom baru
+        applied = []
+        for kind, name, ddl in missing_schema(cursor):
+            print(f"Applying {kind} {name}")
+            cursor.execute(ddl)
+            applied.append(name)
+        conn.commit()
+        cursor.close()
+    return applied
+
+def check_schema():
+    """Cek saat start bahwa skema sudah dimigrasi (SCHEMA_CHECK=True).
+
+    RuntimeError jika ada tabel/kolom/index yang belum ada, supaya app tidak
+    jalan dengan query yang pasti gagal. Database yang belum bisa dihubungi
+    hanya dicatat, tidak menghentikan start.
+    """
+    if not config.SCHEMA_CHECK:
+        return
+    try:
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            missing = missing_schema(cursor)
+            cursor.close()
+    except Exception as e:
+        print(f"Schema check skipped: {str(e)}")
+        return
+    if missing:
+        raise RuntimeError(
+            "Database schema is out of date, missing: "
+            + ', '.join(f'{kind} {name}' for kind, name, _ in missing)
+            + ". Run `python schema_utils.py` to migrate."
+        )
+
+if __name__ == '__main__':
+    applied = migrate_schema()
+    print(f"Schema up to date ({len(applied)} change(s) applied)")
@@ -0,0 +1,730 @@
+import difflib
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+import numpy as np
+from config import get_config
+
+config = get_config()
+
+# Tabel skor lokasi, keyword, area high-end dan bonus kategori ada di file data
+# (SCORING_TABLES_PATH, default scoring_tables.json) dan bisa diubah tanpa deploy;
+# lihat ScoringTables dan get_scoring_tables di bawah.
+
+# Weighting system
+SCORING_WEIGHTS = {
+    'rating': 0.35,                   # 35% - Rating 0-5
+    'jumlah_ulasan': 0.25,            # 25% - Jumlah ulasan
+    'potensi_bisnis_lokasi': 0.15,    # 15% - Potensi lokasi
+    'kepadatan_penduduk': 0.10,       # 10% - Kepadatan
+    'daya_beli_lokasi': 0.15          # 15% - Daya beli
+}
+
+# Revisi aturan yang ada di kode (threshold di apply_business_rules,
+# determine_segmentation dan prioritas). Naikkan setiap kali aturan itu diubah
+# supaya versi scoring ikut berubah dan hasil lama di-rescore.
+SCORING_RULES_REVISION = 2
+
+SEGMENT_RECOMMENDATIONS = {
+    'Premium - Rating Tinggi': [
+        "Prioritas Utama - Program Exclusive",
+        "Partnership Premium - Kolaborasi Strategis",
+        "VIP Treatment - Layanan Prioritas"
+    ],
+    'Expert - Berpengalaman & Terpercaya': [
+        "Prioritas Menengah - Program Growth",
+        "Business Expansion - Pengembangan Jangkauan",
+        "Loyalty Program - Program Loyalitas"
+    ],
+    'Menengah - Berkembang': [
+        "Prioritas Standard - Program Pengembangan",
+        "Quality Improvement - Peningkatan Kualitas",
+        "Marketing Support - Dukungan Pemasaran"
+    ],
+    'Standard - Potensi Berkembang': [
+        "Basic Support - Dukungan Dasar",
+        "Training Program - Program Pelatihan",
+        "Mentorship - Program Pendampingan"
+    ],
+    'Pemula - Perlu Pembinaan': [
+        "Starter Package - Paket Pemula",
+        "Foundation Building - Pembangunan Dasar",
+        "Basic Guidance - Panduan Dasar"
+    ]
+}
+
+def _scoring_config_fingerprint(tables):
+    """Hash pendek dari semua tabel dan bobot scoring; berubah jika aturan berubah"""
+    payload = json.dumps([
+        tables.location_scores, tables.keyword_scores, tables.high_end_areas, tables.kategori_bonus,
+        SCORING_WEIGHTS, SEGMENT_RECOMMENDATIONS, SCORING_RULES_REVISION,
+        tables.kategori_synonyms, tables.kategori_fuzzy_cutoff
+    ], sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+# Engine scoring: 'rules' (bobot & aturan bisnis di atas) atau 'model' (RandomForest + KMeans hasil training)
+SCORING_ENGINES = ('rules', 'model')
+
+# Urutan kolom input model, sama dengan query training di /api/retrain
+MODEL_FEATURE_COLUMNS = [
+    'frekuensi_transaksi', 'nilai_transaksi_rata_rata', 'lama_usaha_bulan',
+    'luas_area_usaha', 'potensi_bisnis_lokasi', 'kepadatan_penduduk', 'daya_beli_lokasi'
+]
+
+FEATURE_COLUMNS = [
+    'rating', 'jumlah_ulasan', 'potensi_bisnis_lokasi',
+    'kepadatan_penduduk', 'daya_beli_lokasi', 'kategori_bonus'
+]
+
+class LocationMatcher:
+    """Index lokasi terkompilasi: satu scan regex per alamat untuk semua kota/keyword.
+
+    Setiap tabel berisi mapping nama -> {'potensi', 'kepadatan', 'daya_beli'}.
+    Pola regex dibangun sebagai trie sehingga biaya per alamat tergantung
+    panjang alamat, bukan jumlah entri tabel.
+    """
+
+    def __init__(self, score_tables, high_end_areas=(), default_score=5, high_end_daya_beli=9):
+        self.default_score = default_score
+        entries = {}
+        for table in score_tables:
+            for key, scores in table.items():
+                self._merge(entries, key.lower(), (scores['potensi'], scores['kepadatan'], scores['daya_beli']))
+        for area in high_end_areas:
+            self._merge(entries, area.lower(), (0, 0, high_end_daya_beli))
+
+        self.pattern = re.compile('(?=(' + _trie_pattern(list(entries)) + '))') if entries else None
+
+        # Regex hanya mengembalikan match terpanjang per posisi, jadi skor tiap
+        # key harus sudah mencakup semua key lain yang merupakan substring-nya.
+        # Key diproses dari yang terpendek: substring sejati ada di key[:-1] atau
+        # key[1:], dan match terpanjang di sana sudah dilipat lebih dulu.
+        self.scores = {}
+        for key in sorted(entries, key=len):
+            combined = entries[key]
+            for part in (key[:-1], key[1:]):
+                for other in set(self.pattern.findall(part)):
+                    combined = tuple(map(max, combined, self.scores[other]))
+            self.scores[key] = combined
+
+    @staticmethod
+    def _merge(entries, key, scores):
+        if not key:
+            return
+        if key in entries:
+            scores = tuple(map(max, entries[key], scores))
+        entries[key] = scores
+
+    def match(self, lokasi):
+        """Return (potensi, kepadatan, daya_beli) untuk string lokasi (lowercase)"""
+        potensi = kepadatan = daya_beli = self.default_score
+        if self.pattern is None:
+            return potensi, kepadatan, daya_beli
+
+        for key in set(self.pattern.findall(lokasi)):
+            p, k, d = self.scores[key]
+            potensi = max(potensi, p)
+            kepadatan = max(kepadatan, k)
+            daya_beli = max(daya_beli, d)
+        return potensi, kepadatan, daya_beli
+
+def _trie_pattern(keys):
+    """Bangun pola regex berbentuk trie dari daftar string literal"""
+    trie = {}
+    for key in keys:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        terminal = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if terminal:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+# Karakter yang aman dibuang di ujung segmen alamat (kode pos, titik singkatan)
+_SEGMENT_STRIP_CHARS = ' \t\r\n.0123456789'
+
+class ScoringTables:
+    """Tabel scoring dari file data, dikompilasi sekali per load (bukan per baris).
+
+    Lokasi, keyword dan area high-end di-index dalam satu LocationMatcher.
+    Kategori usaha di-intern menjadi kode integer dengan array bonus per kode
+    (kode 0 = kategori tidak dikenal, bonus 0).
+    """
+
+    def __init__(self, data, source=None, signature=None):
+        self.location_scores = _score_table(data.get('location_scores', {}))
+        self.keyword_scores = _score_table(data.get('keyword_scores', {}))
+        self.high_end_areas = [str(area).lower() for area in data.get('high_end_areas', [])]
+        self.kategori_bonus = {
+            _normalize_kategori(kategori): int(bonus) for kategori, bonus in data.get('kategori_bonus', {}).items()
+        }
+        self.kategori_synonyms = {
+            _normalize_kategori(alias): _normalize_kategori(kategori)
+            for alias, kategori in data.get('kategori_synonyms', {}).items()
+        }
+        self.kategori_fuzzy_cutoff = float(data.get('kategori_fuzzy_cutoff', 0.85))
+        unknown = sorted(set(self.kategori_synonyms.values()) - set(self.kategori_bonus))
+        if unknown:
+            raise ValueError(f"kategori_synonyms point to unknown kategori: {', '.join(unknown)}")
+
+        self.kategori_codes = {kategori: code for code, kategori in enumerate(self.kategori_bonus, start=1)}
+        self.kategori_bonus_array = np.array([0] + list(self.kategori_bonus.values()), dtype=np.int64)
+        # Semua nama yang dikenali (kategori + sinonim) -> kode kategori
+        self.kategori_lookup = dict(self.kategori_codes)
+        for alias, kategori in self.kategori_synonyms.items():
+            self.kategori_lookup.setdefault(alias, self.kategori_codes[kategori])
+        self._kategori_fuzzy_names = sorted(name for name in self.kategori_lookup if len(name) >= 4)
+        self._kategori_max_words = max((len(name.split()) for name in self.kategori_lookup), default=1)
+        # Hasil resolve per nilai mentah; tiap nilai berbeda cukup di-resolve sekali
+        self._kategori_resolved = {}
+        self.matcher = LocationMatcher([self.location_scores, self.keyword_scores], self.high_end_areas)
+
+        # Cache per segmen alamat hanya valid jika tidak ada key yang mengandung koma
+        # atau karakter yang dibuang dari ujung segmen
+        self.segment_cache_safe = all(
+            ',' not in key and key == key.strip(_SEGMENT_STRIP_CHARS) for key in self.matcher.scores
+        )
+
+        self.version = _scoring_config_fingerprint(self)
+        self.source = source
+        self.signature = signature
+        self.loaded_at = time.time()
+
+    def resolve_kategori(self, value):
+        """Kode kategori untuk nilai kategori_usaha mentah (0 = tidak dikenal)"""
+        code = self._kategori_resolved.get(value)
+        if code is None:
+            code = self._resolve_kategori(_normalize_kategori(value))
+            if len(self._kategori_resolved) >= config.KATEGORI_CACHE_SIZE:
+                self._kategori_resolved.clear()
+            self._kategori_resolved[value] = code
+        return code
+
+    def _resolve_kategori(self, name):
+        """Urutan: nama persis / sinonim, frasa di dalam nama (bonus tertinggi), lalu fuzzy"""
+        if not name:
+            return 0
+        code = self.kategori_lookup.get(name)
+        if code is not None:
+            return code
+
+        words = name.split()
+        phrases = [
+            ' '.join(words[start:start + size])
+            for size in range(1, min(self._kategori_max_words, len(words)) + 1)
+            for start in range(len(words) - size + 1)
+        ]
+        codes = [self.kategori_lookup[phrase] for phrase in phrases if phrase in self.kategori_lookup]
+        if codes:
+            return max(codes, key=lambda code: self.kategori_bonus_array[code])
+
+        # Salah ketik ("restauran", "teknlogi"): cocokkan nama utuh lalu tiap kata
+        for candidate in [name] + [word for word in words if len(word) >= 5]:
+            matches = difflib.get_close_matches(
+                candidate, self._kategori_fuzzy_names, n=1, cutoff=self.kategori_fuzzy_cutoff
+            )
+            if matches:
+                return self.kategori_lookup[matches[0]]
+        return 0
+
+    def kategori_bonus_for(self, kategori):
+        """Bonus untuk satu nilai kategori_usaha mentah"""
+        return self.kategori_bonus_array[self.resolve_kategori(kategori)]
+
+    def encode_kategori(self, values):
+        """Kode integer untuk deretan nilai kategori unik"""
+        return np.fromiter((self.resolve_kategori(value) for value in values),
+                           dtype=np.int64, count=len(values))
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'locations': len(self.location_scores),
+            'keywords': len(self.keyword_scores),
+            'high_end_areas': len(self.high_end_areas),
+            'kategori': len(self.kategori_bonus),
+            'kategori_synonyms': len(self.kategori_synonyms),
+            'kategori_resolved': len(self._kategori_resolved)
+        }
+
+_KATEGORI_SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+def _normalize_kategori(value):
+    """Lowercase, tanda baca jadi spasi, spasi ganda dirapikan (" Pet-Shop " -> "pet shop")"""
+    return ' '.join(_KATEGORI_SEPARATORS.sub(' ', str(value).lower()).split())
+
+def _score_table(table):
+    """Validasi tabel {nama: {'potensi', 'kepadatan', 'daya_beli'}} (key lowercase, nilai int)"""
+    return {
+        str(key).lower(): {
+            'potensi': int(scores['potensi']),
+            'kepadatan': int(scores['kepadatan']),
+            'daya_beli': int(scores['daya_beli'])
+        }
+        for key, scores in table.items()
+    }
+
+def load_scoring_tables(path=None):
+    """Baca dan kompilasi file tabel scoring (JSON)"""
+    path = path or config.SCORING_TABLES_PATH
+    stat = os.stat(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"Scoring tables in {path} must be a JSON object")
+    return ScoringTables(data, source=path, signature=(stat.st_mtime_ns, stat.st_size))
+
+_scoring_tables = None
+_scoring_tables_checked_at = 0.0
+_scoring_tables_failed_signature = None
+_scoring_tables_lock = threading.Lock()
+
+def reload_scoring_tables(force=False):
+    """Load ulang tabel jika file berubah (mtime/ukuran) atau force=True.
+
+    Mengembalikan (tables, previous). Jika file baru tidak valid, tabel lama
+    tetap dipakai; error hanya di-raise untuk force=True atau load pertama.
+    Reload berlaku per proses (per worker gunicorn).
+    """
+    global _scoring_tables, _scoring_tables_failed_signature
+    with _scoring_tables_lock:
+        current = _scoring_tables
+        path = config.SCORING_TABLES_PATH
+        signature = None
+        try:
+            if not force and current is not None and current.source == path:
+                stat = os.stat(path)
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if signature in (current.signature, _scoring_tables_failed_signature):
+                    return current, current
+            tables = load_scoring_tables(path)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            if force or current is None:
+                raise
+            # File yang sama tidak dicoba (dan di-log) ulang sampai berubah lagi
+            _scoring_tables_failed_signature = signature
+            print(f"Failed to reload scoring tables, keeping version {current.version}: {str(e)}")
+            return current, current
+
+        _scoring_tables = tables
+        _scoring_tables_failed_signature = None
+        _match_location_cached.cache_clear()
+        return tables, current
+
+def get_scoring_tables():
+    """Tabel scoring aktif; mtime file dicek paling sering tiap SCORING_TABLES_CHECK_SECONDS"""
+    global _scoring_tables_checked_at
+    tables = _scoring_tables
+    if tables is None:
+        return reload_scoring_tables()[0]
+
+    interval = config.SCORING_TABLES_CHECK_SECONDS
+    if interval > 0:
+        now = time.monotonic()
+        if now - _scoring_tables_checked_at >= interval:
+            _scoring_tables_checked_at = now
+            tables = reload_scoring_tables()[0]
+    return tables
+
+def _location_segments(lokasi):
+    """Pecah alamat per koma menjadi segmen ternormalisasi.
+
+    Tidak ada key lokasi yang mengandung koma, jadi skor alamat sama dengan
+    skor maksimum dari tiap segmennya. Segmen ekor seperti "kota pekalongan"
+    atau "jawa tengah 51146" berulang di ribuan baris dan cukup di-score sekali.
+    """
+    segments = set()
+    for segment in lokasi.split(','):
+        segment = segment.strip(_SEGMENT_STRIP_CHARS)
+        if segment:
+            segments.add(segment)
+    return segments
+
+@lru_cache(maxsize=config.LOCATION_CACHE_SIZE)
+def _match_location_cached(matcher, segment):
+    return matcher.match(segment)
+
+def extract_location_features(lokasi, tables=None):
+    """Hitung potensi, kepadatan dan daya beli dari string lokasi (lowercase)"""
+    tables = tables or get_scoring_tables()
+    matcher = tables.matcher
+    if not tables.segment_cache_safe:
+        return _match_location_cached(matcher, lokasi)
+
+    potensi = kepadatan = daya_beli = matcher.default_score
+    for segment in _location_segments(lokasi):
+        p, k, d = _match_location_cached(matcher, segment)
+        potensi = max(potensi, p)
+        kepadatan = max(kepadatan, k)
+        daya_beli = max(daya_beli, d)
+    return potensi, kepadatan, daya_beli
+
+def location_cache_stats():
+    """Statistik LRU cache lokasi (per proses) untuk sizing LOCATION_CACHE_SIZE"""
+    info = _match_location_cached.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'max_size': info.maxsize,
+        'hit_rate': round(info.hits / lookups, 4) if lookups else 0.0
+    }
+
+def extract_features_from_data(client_data):
+    """Extract features from client data berdasarkan rating"""
+    features = {}
+
+    tables = get_scoring_tables()
+    lokasi = client_data['lokasi'].lower()
+    rating = float(client_data.get('rating', 0))
+    jumlah_ulasan = int(client_data.get('jumlah_ulasan', 0))
+    if math.isnan(rating):
+        # min/max Python tidak konsisten untuk NaN (dan np.clip meneruskannya), jadi ditolak
+        raise ValueError('rating must be a number')
+
+    # 1. RATING (Weight: 35%)
+    features['rating'] = max(0, min(5, rating))  # Ensure 0-5 range
+
+    # 2. JUMLAH ULASAN (Weight: 25%)
+    # Normalize: 0-1000 ulasan → 0-100 scale
+    features['jumlah_ulasan'] = min(jumlah_ulasan, 1000)  # Cap at 1000
+
+    # 3. LOKASI-BASED FEATURES (Weight: 40% total)
+    potensi, kepadatan, daya_beli = extract_location_features(lokasi, tables)
+
+    features['potensi_bisnis_lokasi'] = potensi
+    features['kepadatan_penduduk'] = kepadatan
+    features['daya_beli_lokasi'] = daya_beli
+
+    # KATEGORI USAHA BONUS (Additional 0-10 points)
+    features['kategori_bonus'] = int(tables.kategori_bonus_for(client_data['kategori_usaha']))
+
+    return features
+
+def analyze_potential(features):
+    """Analyze client potential menggunakan weighted scoring system berdasarkan rating"""
+    # Normalize each feature to 0-100 scale
+    normalized_features = {}
+
+    # Rating (0-5 → 0-100)
+    normalized_features['rating'] = (features['rating'] / 5) * 100
+
+    # Jumlah ulasan (0-1000 → 0-100)
+    normalized_features['jumlah_ulasan'] = (features['jumlah_ulasan'] / 1000) * 100
+
+    # Location features (already 0-10 scale → 0-100)
+    normalized_features['potensi_bisnis_lokasi'] = features['potensi_bisnis_lokasi'] * 10
+    normalized_features['kepadatan_penduduk'] = features['kepadatan_penduduk'] * 10
+    normalized_features['daya_beli_lokasi'] = features['daya_beli_lokasi'] * 10
+
+    # Calculate weighted score
+    base_score = 0
+    for feature_name, weight in SCORING_WEIGHTS.items():
+        base_score += normalized_features[feature_name] * weight
+
+    # Add kategori bonus (0-10 points)
+    base_score += features.get('kategori_bonus', 0)
+
+    # Apply business rules adjustments
+    final_score = apply_business_rules(base_score, features)
+
+    # Ensure score is within 0-100 range
+    final_score = max(0, min(100, final_score))
+
+    # Determine segmentation based on rating and business factors
+    segmentasi = determine_segmentation(final_score, features)
+
+    # Determine priority
+    if final_score >= 80:
+        prioritas = "Tinggi"
+    elif final_score >= 60:
+        prioritas = "Sedang"
+    else:
+        prioritas = "Rendah"
+
+    # Recommendation category
+    kategori_rekomendasi = get_recommendation_category(final_score, segmentasi, features)
+
+    return {
+        'skor_potensi': int(round(final_score)),
+        'segmentasi': segmentasi,
+        'prioritas': prioritas,
+        'kategori_rekomendasi': kategori_rekomendasi
+    }
+
+def apply_business_rules(score, features):
+    """Apply business rules adjustments berdasarkan rating"""
+    adjusted_score = score
+
+    # Bonus for high rating
+    if features['rating'] >= 4.5:  # Rating sangat tinggi
+        adjusted_score += 12
+    elif features['rating'] >= 4.0:  # Rating tinggi
+        adjusted_score += 8
+    elif features['rating'] >= 3.5:  # Rating baik
+        adjusted_score += 4
+
+    # Bonus for many reviews (social proof)
+    if features['jumlah_ulasan'] > 500:  # Ulasan sangat banyak
+        adjusted_score += 10
+    elif features['jumlah_ulasan'] > 200:  # Ulasan banyak
+        adjusted_score += 6
+    elif features['jumlah_ulasan'] > 50:  # Ulasan cukup
+        adjusted_score += 3
+
+    # Bonus for premium location
+    if features['potensi_bisnis_lokasi'] >= 80:  # High potential location
+        adjusted_score += 6
+
+    # Bonus for high density area
+    if features['kepadatan_penduduk'] >= 80:  # High density
+        adjusted_score += 4
+
+    # Bonus for high purchasing power
+    if features['daya_beli_lokasi'] >= 80:  # High purchasing power
+        adjusted_score += 5
+
+    # Penalty for low rating
+    if features['rating'] < 2.0:  # Rating sangat rendah
+        adjusted_score -= 15
+    elif features['rating'] < 3.0:  # Rating rendah
+        adjusted_score -= 8
+
+    # Penalty for very few reviews
+    if features['jumlah_ulasan'] < 10:  # Very few reviews
+        adjusted_score -= 5
+
+    return min(100, adjusted_score)  # Cap at 100
+
+def determine_segmentation(score, features):
+    """Determine segmentation based on rating and business factors"""
+    # Base segmentation on score dengan pertimbangan rating
+    if score >= 85:
+        return "Premium - Rating Tinggi"
+    elif score >= 70:
+        if features['rating'] >= 4.0:
+            return "Expert - Berpengalaman & Terpercaya"
+        else:
+            return "Menengah - Berkembang"
+    elif score >= 50:
+        return "Standard - Potensi Berkembang"
+    else:
+        return "Pemula - Perlu Pembinaan"
+
+def get_recommendation_category(score, segment, features):
+    """Get personalized recommendation based on rating factors"""
+    # Select recommendation based on segment
+    segment_recommendations = SEGMENT_RECOMMENDATIONS.get(segment, [
+        "Custom Program - Program Khusus"
+    ])
+
+    # Further customize based on rating characteristics
+    if features['rating'] >= 4.5:
+        return segment_recommendations[0] + " (Rating Excellent)"
+    elif features['rating'] >= 4.0:
+        return segment_recommendations[0] + " (Rating Very Good)"
+    else:
+        return segment_recommendations[0]
+
+# Batch scoring
+
+def extract_features_batch(clients):
+    """Versi kolom dari extract_features_from_data untuk DataFrame berisi banyak klien"""
+    import pandas as pd
+    tables = get_scoring_tables()
+    kategori = clients['kategori_usaha'].astype(str)
+    lokasi = clients['lokasi'].astype(str).str.lower()
+    rating = clients['rating'].astype(float).to_numpy()
+    jumlah_ulasan = clients['jumlah_ulasan'].astype(np.int64).to_numpy()
+    if np.isnan(rating).any():
+        raise ValueError('rating must be a number')
+
+    # Lokasi yang sama cukup di-match sekali
+    codes, unique_lokasi = pd.factorize(lokasi)
+    location_table = np.array([extract_location_features(value, tables) for value in unique_lokasi],
+                              dtype=np.int64).reshape(-1, 3)
+    location_features = location_table[codes]
+    potensi = location_features[:, 0]
+    kepadatan = location_features[:, 1]
+    daya_beli = location_features[:, 2]
+
+    # Kategori di-intern ke kode integer: normalisasi/fuzzy match hanya sekali per
+    # nilai berbeda, bonus per baris diambil dari array per kode
+    kategori_codes, unique_kategori = pd.factorize(kategori)
+    kategori_bonus = tables.kategori_bonus_array[tables.encode_kategori(unique_kategori)][kategori_codes]
+
+    return pd.DataFrame({
+        'rating': np.clip(rating, 0, 5),
+        'jumlah_ulasan': np.minimum(jumlah_ulasan, 1000),
+        'potensi_bisnis_lokasi': potensi,
+        'kepadatan_penduduk': kepadatan,
+        'daya_beli_lokasi': daya_beli,
+        'kategori_bonus': kategori_bonus
+    }, index=clients.index)
+
+def analyze_potential_batch(features):
+    """Versi kolom dari analyze_potential, hasil identik dengan jalur per-baris"""
+    import pandas as pd
+    rating = features['rating'].to_numpy(dtype=float)
+    jumlah_ulasan = features['jumlah_ulasan'].to_numpy()
+    potensi = features['potensi_bisnis_lokasi'].to_numpy()
+    kepadatan = features['kepadatan_penduduk'].to_numpy()
+    daya_beli = features['daya_beli_lokasi'].to_numpy()
+
+    # Urutan penjumlahan sama dengan analyze_potential agar hasil float identik
+    normalized_features = {
+        'rating': (rating / 5) * 100,
+        'jumlah_ulasan': (jumlah_ulasan / 1000) * 100,
+        'potensi_bisnis_lokasi': potensi * 10,
+        'kepadatan_penduduk': kepadatan * 10,
+        'daya_beli_lokasi': daya_beli * 10
+    }
+    base_score = np.zeros(len(features))
+    for feature_name, weight in SCORING_WEIGHTS.items():
+        base_score += normalized_features[feature_name] * weight
+    base_score += features['kategori_bonus'].to_numpy()
+
+    final_score = apply_business_rules_batch(base_score, rating, jumlah_ulasan,
+                                             potensi, kepadatan, daya_beli)
+    final_score = np.clip(final_score, 0, 100)
+
+    segmentasi = np.select(
+        [final_score >= 85,
+         (final_score >= 70) & (rating >= 4.0),
+         final_score >= 70,
+         final_score >= 50],
+        ["Premium - Rating Tinggi",
+         "Expert - Berpengalaman & Terpercaya",
+         "Menengah - Berkembang",
+         "Standard - Potensi Berkembang"],
+        default="Pemula - Perlu Pembinaan"
+    ).astype(object)
+
+    prioritas = prioritas_batch(final_score)
+
+    base_recommendation = pd.Series(segmentasi).map(
+        {segment: recs[0] for segment, recs in SEGMENT_RECOMMENDATIONS.items()}
+    ).fillna("Custom Program - Program Khusus").to_numpy(dtype=object)
+    suffix = np.select(
+        [rating >= 4.5, rating >= 4.0],
+        [" (Rating Excellent)", " (Rating Very Good)"],
+        default=""
+    ).astype(object)
+
+    return pd.DataFrame({
+        'skor_potensi': np.round(final_score).astype(np.int64),
+        'segmentasi': segmentasi,
+        'prioritas': prioritas,
+        'kategori_rekomendasi': base_recommendation + suffix
+    }, index=features.index)
+
+def prioritas_batch(final_score):
+    return np.select(
+        [final_score >= 80, final_score >= 60],
+        ["Tinggi", "Sedang"],
+        default="Rendah"
+    ).astype(object)
+
+def apply_business_rules_batch(score, rating, jumlah_ulasan, potensi, kepadatan, daya_beli):
+    """Versi kolom dari apply_business_rules"""
+    adjusted_score = score.copy()
+
+    adjusted_score += np.select([rating >= 4.5, rating >= 4.0, rating >= 3.5], [12, 8, 4], default=0)
+    adjusted_score += np.select(
+        [jumlah_ulasan > 500, jumlah_ulasan > 200, jumlah_ulasan > 50], [10, 6, 3], default=0
+    )
+    adjusted_score += np.where(potensi >= 80, 6, 0)
+    adjusted_score += np.where(kepadatan >= 80, 4, 0)
+    adjusted_score += np.where(daya_beli >= 80, 5, 0)
+    adjusted_score -= np.select([rating < 2.0, rating < 3.0], [15, 8], default=0)
+    adjusted_score -= np.where(jumlah_ulasan < 10, 5, 0)
+
+    return np.minimum(adjusted_score, 100)  # Cap at 100
+
+def resolve_scoring_engine(engine=None):
+    """Nama engine yang valid (default dari SCORING_ENGINE); ValueError jika tidak dikenal"""
+    engine = (engine or config.SCORING_ENGINE).strip().lower()
+    if engine not in SCORING_ENGINES:
+        raise ValueError(f"Unknown scoring engine '{engine}', use one of: {', '.join(SCORING_ENGINES)}")
+    return engine
+
+def scoring_version(engine=None):
+    """Versi hasil scoring untuk engine: fingerprint aturan, atau versi artifact model"""
+    if resolve_scoring_engine(engine) == 'rules':
+        return get_scoring_tables().version
+    from model_utils import MODEL_REGISTRY
+    return f"model-{MODEL_REGISTRY.get().version}"
+
+def predict_potential_batch(features, bundle=None):
+    """Score batch fitur dengan scaler/RandomForest/KMeans dalam satu panggilan predict per model.
+
+    Data klien (CSV/form) tidak punya fitur transaksi, jadi kolom itu diisi
+    rata-rata data training (nilai 0 setelah scaling) dan model bekerja dari
+    fitur lokasi.
+    """
+    import pandas as pd
+    from model_utils import MODEL_REGISTRY, get_segment_name
+    from model_utils import get_recommendation_category as get_model_recommendation
+    bundle = bundle or MODEL_REGISTRY.get()
+
+    X = np.tile(np.asarray(bundle.scaler.mean_, dtype=float), (len(features), 1))
+    for i, column in enumerate(MODEL_FEATURE_COLUMNS):
+        if column in features:
+            X[:, i] = features[column].to_numpy(dtype=float)
+    X_scaled = bundle.scaler.transform(X)
+
+    final_score = np.clip(bundle.model.predict(X_scaled), 0, 100)
+    clusters = bundle.kmeans.predict(X_scaled)
+    segmentasi = pd.Series(clusters).map(
+        {cluster: get_segment_name(int(cluster)) for cluster in np.unique(clusters)}
+    ).to_numpy(dtype=object)
+
+    skor_potensi = np.round(final_score).astype(np.int64)
+    recommendation = {
+        (score, segment): get_model_recommendation(score, segment)
+        for score, segment in set(zip(skor_potensi.tolist(), segmentasi))
+    }
+
+    return pd.DataFrame({
+        'skor_potensi': skor_potensi,
+        'segmentasi': segmentasi,
+        'prioritas': prioritas_batch(final_score),
+        'kategori_rekomendasi': [
+            recommendation[key] for key in zip(skor_potensi.tolist(), segmentasi)
+        ]
+    }, index=features.index)
+
+def score_clients_batch(clients, engine=None):
+    """Score banyak klien sekaligus (DataFrame atau list of dict).
+
+    Mengembalikan DataFrame berisi kolom fitur dan kolom hasil analisis
+    (skor_potensi, segmentasi, prioritas, kategori_rekomendasi).
+    engine: 'rules' atau 'model'; default dari SCORING_ENGINE.
+    """
+    import pandas as pd
+    if not isinstance(clients, pd.DataFrame):
+        clients = pd.DataFrame(list(clients), columns=['kategori_usaha', 'lokasi', 'rating', 'jumlah_ulasan'])
+
+    features = extract_features_batch(clients)
+    if resolve_scoring_engine(engine) == 'model':
+        results = predict_potential_batch(features)
+    else:
+        results = analyze_potential_batch(features)
+    return pd.concat([features, results], axis=1)
@@ -0,0 +1,129 @@
+from collections import defaultdict
+
+# Scope ringkasan: data klien (form/API) dan tiap upload CSV
+SCOPE_CLIENTS = 'clients'
+SCOPE_CSV_UPLOAD = 'csv_upload'
+
+SUMMARY_UPSERT_SQL = """
+    INSERT INTO analysis_summary (scope, scope_id, dimension, bucket, row_count, score_sum)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        row_count = row_count + VALUES(row_count),
+        score_sum = score_sum + VALUES(score_sum)
+"""
+
+def score_bucket(score):
+    """Bucket histogram skor per 10 poin (100 masuk ke 90-100)"""
+    start = min(int(score) // 10 * 10, 90)
+    return f"{start}-{start + 9}" if start < 90 else "90-100"
+
+def aggregate_rows(rows):
+    """Hitung agregat (count, sum skor) per dimensi dari iterable (skor, prioritas, segmentasi)"""
+    aggregates = defaultdict(lambda: [0, 0])
+    for score, prioritas, segmentasi in rows:
+        if score is None:
+            continue
+        score = int(score)
+        for key in (('total', 'all'),
+                    ('prioritas', prioritas or '-'),
+                    ('segmentasi', segmentasi or '-'),
+                    ('score_bucket', score_bucket(score))):
+            aggregates[key][0] += 1
+            aggregates[key][1] += score
+    return aggregates
+
+def update_summary(cursor, scope, scope_id, rows):
+    """Tambahkan baris yang baru di-score ke tabel ringkasan (dalam transaksi pemanggil)"""
+    aggregates = aggregate_rows(rows)
+    if not aggregates:
+        return
+    cursor.executemany(SUMMARY_UPSERT_SQL, [
+        (scope, scope_id, dimension, bucket, count, score_sum)
+        for (dimension, bucket), (count, score_sum) in aggregates.items()
+    ])
+
+def replace_summary_rows(cursor, scope, scope_id, old_rows, new_rows):
+    """Ganti kontribusi baris lama dengan hasil barunya (dipakai saat rescoring)"""
+    deltas = aggregate_rows(new_rows)
+    for key, (count, score_sum) in aggregate_rows(old_rows).items():
+        deltas[key][0] -= count
+        deltas[key][1] -= score_sum
+    changed = [(key, delta) for key, delta in deltas.items() if delta != [0, 0]]
+    if not changed:
+        return
+    cursor.executemany(SUMMARY_UPSERT_SQL, [
+        (scope, scope_id, dimension, bucket, count, score_sum)
+        for (dimension, bucket), (count, score_sum) in changed
+    ])
+
+def delete_summary(cursor, scope, scope_id):
+    cursor.execute(
+        "DELETE FROM analysis_summary WHERE scope = %s AND scope_id = %s",
+        (scope, scope_id)
+    )
+
+def copy_summary(cursor, scope, source_id, target_id):
+    """Salin ringkasan upload lama ke upload baru (dipakai saat hasil di-clone)"""
+    cursor.execute("""
+        INSERT INTO analysis_summary (scope, scope_id, dimension, bucket, row_count, score_sum)
+        SELECT scope, %s, dimension, bucket, row_count, score_sum
+        FROM analysis_summary
+        WHERE scope = %s AND scope_id = %s
+    """, (target_id, scope, source_id))
+
+def rebuild_summary(cursor, scope, scope_id=0):
+    """Hitung ulang ringkasan dari tabel hasil (untuk backfill data lama)"""
+    delete_summary(cursor, scope, scope_id)
+    if scope == SCOPE_CLIENTS:
+        cursor.execute("SELECT skor_potensi, prioritas, segmentasi FROM analysis_results")
+    else:
+        cursor.execute(
+            "SELECT potential_score, priority, segmentation FROM csv_analysis_results WHERE upload_id = %s",
+            (scope_id,)
+        )
+    aggregates = defaultdict(lambda: [0, 0])
+    while True:
+        rows = cursor.fetchmany(5000)
+        if not rows:
+            break
+        rows = [tuple(row.values()) if isinstance(row, dict) else row for row in rows]
+        for key, (count, score_sum) in aggregate_rows(rows).items():
+            aggregates[key][0] += count
+            aggregates[key][1] += score_sum
+    if aggregates:
+        cursor.executemany(SUMMARY_UPSERT_SQL, [
+            (scope, scope_id, dimension, bucket, count, score_sum)
+            for (dimension, bucket), (count, score_sum) in aggregates.items()
+        ])
+
+def fetch_summary(cursor, scope, scope_id=0):
+    """Baca ringkasan (O(jumlah bucket)) dalam format yang dipakai dashboard"""
+    cursor.execute(
+        "SELECT dimension, bucket, row_count, score_sum FROM analysis_summary WHERE scope = %s AND scope_id = %s",
+        (scope, scope_id)
+    )
+    rows = cursor.fetchall()
+    rows = [tuple(row.values()) if isinstance(row, dict) else row for row in rows]
+
+    total_count, total_sum = 0, 0
+    by_dimension = defaultdict(dict)
+    for dimension, bucket, row_count, score_sum in rows:
+        if dimension == 'total':
+            total_count, total_sum = int(row_count), int(score_sum)
+        elif row_count:
+            by_dimension[dimension][bucket] = int(row_count)
+
+    prioritas = by_dimension.get('prioritas', {})
+    return {
+        'total_clients': total_count,
+        'avg_score': round(total_sum / total_count, 2) if total_count else 0,
+        'high_priority': prioritas.get('Tinggi', 0),
+        'medium_priority': prioritas.get('Sedang', 0),
+        'low_priority': prioritas.get('Rendah', 0),
+        'prioritas': prioritas,
+        'segmentasi': by_dimension.get('segmentasi', {}),
+        'score_histogram': dict(sorted(
+            by_dimension.get('score_bucket', {}).items(),
+            key=lambda item: int(item[0].split('-')[0])
+        ))
+    }
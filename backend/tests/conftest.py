@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul backend berupa file flat (app.py, db_utils.py, ...), bukan package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
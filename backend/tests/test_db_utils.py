@@ -0,0 +1,134 @@
+import os
+import threading
+
+import pytest
+from mysql.connector import errors
+
+import db_utils
+
+
+class ExhaustedPool:
+    """Pool palsu yang habis sampai release() dipanggil"""
+
+    def __init__(self):
+        self.available = threading.Event()
+        self.attempts = 0
+
+    def get_connection(self):
+        self.attempts += 1
+        if not self.available.is_set():
+            raise errors.PoolError("Failed getting connection; pool exhausted")
+        return FakeConnection()
+
+
+class FakeConnection:
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    fake = ExhaustedPool()
+    monkeypatch.setattr(db_utils, '_pool', fake)
+    monkeypatch.setattr(db_utils, '_pool_pid', os.getpid())
+    monkeypatch.setattr(db_utils, '_pool_stats', dict.fromkeys(db_utils._pool_stats, 0))
+    return fake
+
+
+def test_exhausted_pool_times_out(pool, monkeypatch):
+    monkeypatch.setattr(db_utils.config, 'DB_POOL_TIMEOUT', 0.05)
+
+    with pytest.raises(errors.PoolError):
+        db_utils.get_db_connection()
+
+    stats = db_utils.pool_stats()
+    assert pool.attempts > 1
+    assert stats['waits'] == 1
+    assert stats['timeouts'] == 1
+    assert stats['checkouts'] == 0
+
+
+def test_exhausted_pool_waits_for_release(pool, monkeypatch):
+    monkeypatch.setattr(db_utils.config, 'DB_POOL_TIMEOUT', 5)
+    threading.Timer(0.05, pool.available.set).start()
+
+    conn = db_utils.get_db_connection()
+
+    stats = db_utils.pool_stats()
+    assert stats['waits'] == 1
+    assert stats['timeouts'] == 0
+    assert stats['in_use'] == 1
+    conn.close()
+    assert db_utils.pool_stats()['in_use'] == 0
+
+
+class LockServer:
+    """GET_LOCK/RELEASE_LOCK/IS_FREE_LOCK palsu yang dipakai bersama semua koneksi"""
+
+    def __init__(self):
+        self.holders = {}
+
+    def connection(self):
+        return LockConnection(self)
+
+
+class LockConnection:
+    def __init__(self, server):
+        self.server = server
+
+    def cursor(self):
+        return LockCursor(self)
+
+    def close(self):
+        # Seperti server MySQL: lock sesi lepas saat koneksi direset/ditutup
+        for name, holder in list(self.server.holders.items()):
+            if holder is self:
+                del self.server.holders[name]
+
+
+class LockCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = None
+
+    def execute(self, query, params):
+        name, holders = params[0], self.conn.server.holders
+        if 'GET_LOCK' in query:
+            self.result = int(holders.setdefault(name, self.conn) is self.conn)
+        elif 'RELEASE_LOCK' in query:
+            self.result = int(holders.get(name) is self.conn)
+            if self.result:
+                del holders[name]
+        else:
+            self.result = int(name not in holders)
+
+    def fetchone(self):
+        return (self.result,)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def lock_server(monkeypatch):
+    server = LockServer()
+    monkeypatch.setattr(db_utils, '_pool', type('Pool', (), {'get_connection': lambda self: server.connection()})())
+    monkeypatch.setattr(db_utils, '_pool_pid', os.getpid())
+    return server
+
+
+def test_named_lock_is_exclusive(lock_server):
+    with db_utils.named_lock('rescore'):
+        assert not db_utils.lock_is_free('rescore')
+        assert db_utils.lock_is_free('retrain')
+        with pytest.raises(RuntimeError):
+            with db_utils.named_lock('rescore'):
+                pass
+    assert db_utils.lock_is_free('rescore')
+
+
+def test_named_lock_released_on_error(lock_server):
+    with pytest.raises(ValueError):
+        with db_utils.named_lock('rescore'):
+            raise ValueError('job failed')
+    assert db_utils.lock_is_free('rescore')
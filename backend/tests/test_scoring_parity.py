@@ -0,0 +1,79 @@
+import math
+import random
+
+import pytest
+
+import scoring_utils
+from csv_utils import parse_csv_row, score_csv_rows
+
+EDGE_RATINGS = [0, 1.9, 2, 2.9, 3, 3.49, 3.5, 4, 4.5, 5, -1, -0.01, 5.01, 7, math.inf, -math.inf]
+EDGE_ULASAN = [0, 9, 10, 50, 51, 200, 201, 500, 501, 1000, 1001, 5000, -1, -500]
+
+
+def _rows(count=3000, seed=7):
+    tables = scoring_utils.get_scoring_tables()
+    words = (list(tables.location_scores) + list(tables.keyword_scores)
+             + list(tables.high_end_areas) + ['jl. veteran', 'kota pekalongan', ''])
+    kategori = list(tables.kategori_bonus) + ['Pet Shop', 'restoran', 'x', '']
+    rng = random.Random(seed)
+    return [
+        {
+            'kategori_usaha': rng.choice(kategori),
+            'lokasi': ', '.join(rng.choice(words) for _ in range(rng.randint(0, 3))).title(),
+            'rating': rng.choice(EDGE_RATINGS + [rng.uniform(0, 5)]),
+            'jumlah_ulasan': rng.choice(EDGE_ULASAN + [rng.randint(0, 3000)])
+        }
+        for _ in range(count)
+    ]
+
+
+def test_batch_matches_per_row_scoring():
+    rows = _rows()
+    batch = scoring_utils.score_clients_batch(rows, 'rules')
+
+    for row, (_, scored) in zip(rows, batch.iterrows()):
+        features = scoring_utils.extract_features_from_data(row)
+        expected = dict(features, **scoring_utils.analyze_potential(features))
+        actual = {key: scored[key] for key in expected}
+        assert actual == expected, row
+
+
+@pytest.mark.parametrize('rating', [math.nan, -math.nan])
+def test_nan_rating_rejected_by_both_paths(rating):
+    row = {'kategori_usaha': 'Cafe', 'lokasi': 'Jakarta', 'rating': rating, 'jumlah_ulasan': 10}
+    with pytest.raises(ValueError):
+        scoring_utils.extract_features_from_data(row)
+    with pytest.raises(ValueError):
+        scoring_utils.score_clients_batch([row], 'rules')
+
+
+@pytest.mark.parametrize('rating', ['nan', 'NaN', 'inf', '-inf', 'Infinity', '-1', '5.5'])
+def test_parse_csv_row_rejects_invalid_rating(rating):
+    row = {'nama': 'Toko', 'kategori_usaha': 'Cafe', 'lokasi': 'Jakarta', 'rating': rating, 'jumlah_ulasan': '10'}
+    assert parse_csv_row(row) is None
+
+
+@pytest.mark.parametrize('jumlah_ulasan', ['-1', str(2**31)])
+def test_parse_csv_row_rejects_invalid_jumlah_ulasan(jumlah_ulasan):
+    row = {'nama': 'Toko', 'kategori_usaha': 'Cafe', 'lokasi': 'Jakarta', 'rating': '4', 'jumlah_ulasan': jumlah_ulasan}
+    assert parse_csv_row(row) is None
+
+
+def test_csv_chunk_with_invalid_rows_matches_per_row_scoring():
+    csv_rows = [
+        {'nama': f'Toko {i}', 'kategori_usaha': 'Cafe', 'lokasi': 'Jakarta Selatan',
+         'rating': rating, 'jumlah_ulasan': '120'}
+        for i, rating in enumerate(['4.6', 'nan', '3.2', 'inf', '-2', 'abc', '5'])
+    ]
+    values, error_count = score_csv_rows(csv_rows, engine='rules')
+
+    # 'abc' gagal di float() (error), nan/inf/-2 dilewati seperti rating di luar 0-5
+    assert error_count == 1
+    assert [row[0] for row in values] == ['Toko 0', 'Toko 2', 'Toko 6']
+    for row in values:
+        features = scoring_utils.extract_features_from_data(
+            {'kategori_usaha': row[4], 'lokasi': row[5], 'rating': row[6], 'jumlah_ulasan': row[7]}
+        )
+        result = scoring_utils.analyze_potential(features)
+        assert row[8:12] == (result['skor_potensi'], result['segmentasi'],
+                             result['prioritas'], result['kategori_rekomendasi'])
@@ -34,6 +34,7 @@ CREATE TABLE `analysis_results` (
   `segmentasi` varchar(50) DEFAULT NULL,
   `prioritas` varchar(20) DEFAULT NULL,
   `kategori_rekomendasi` varchar(100) DEFAULT NULL,
+  `scoring_version` varchar(32) DEFAULT NULL,
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
@@ -47,6 +48,22 @@ INSERT INTO `analysis_results` (`id`, `client_id`, `skor_potensi`, `segmentasi`,
 
 -- --------------------------------------------------------
 
+--
+-- Table structure for table `analysis_summary`
+--
+
+CREATE TABLE `analysis_summary` (
+  `scope` varchar(20) NOT NULL,
+  `scope_id` int NOT NULL DEFAULT '0',
+  `dimension` varchar(20) NOT NULL,
+  `bucket` varchar(100) NOT NULL,
+  `row_count` int NOT NULL DEFAULT '0',
+  `score_sum` bigint NOT NULL DEFAULT '0',
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Table structure for table `clients`
 --
@@ -87,6 +104,8 @@ CREATE TABLE `csv_analysis_results` (
   `segmentation` varchar(50) DEFAULT NULL,
   `priority` varchar(20) DEFAULT NULL,
   `recommendation_category` varchar(100) DEFAULT NULL,
+  `lead_fingerprint` char(32) DEFAULT NULL,
+  `scoring_version` varchar(32) DEFAULT NULL,
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
@@ -128,7 +147,11 @@ CREATE TABLE `csv_uploads` (
   `original_name` varchar(255) NOT NULL,
   `total_rows` int DEFAULT NULL,
   `processed_rows` int DEFAULT NULL,
+  `duplicate_rows` int DEFAULT '0',
   `status` enum('pending','processing','completed','failed') DEFAULT 'pending',
+  `content_hash` char(64) DEFAULT NULL,
+  `scoring_version` varchar(32) DEFAULT NULL,
+  `processing_token` char(32) DEFAULT NULL,
   `created_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
@@ -175,26 +198,38 @@ INSERT INTO `features` (`id`, `client_id`, `frekuensi_transaksi`, `nilai_transak
 --
 ALTER TABLE `analysis_results`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `client_id` (`client_id`);
+  ADD KEY `client_id` (`client_id`),
+  ADD KEY `skor_potensi_client` (`skor_potensi`,`client_id`);
+
+--
+-- Indexes for table `analysis_summary`
+--
+ALTER TABLE `analysis_summary`
+  ADD PRIMARY KEY (`scope`,`scope_id`,`dimension`,`bucket`);
 
 --
 -- Indexes for table `clients`
 --
 ALTER TABLE `clients`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `created_at` (`created_at`);
 
 --
 -- Indexes for table `csv_analysis_results`
 --
 ALTER TABLE `csv_analysis_results`
   ADD PRIMARY KEY (`id`),
-  ADD KEY `upload_id` (`upload_id`);
+  ADD KEY `upload_id` (`upload_id`),
+  ADD KEY `upload_score` (`upload_id`,`potential_score`),
+  ADD KEY `upload_priority_score` (`upload_id`,`priority`,`potential_score`),
+  ADD KEY `lead_fingerprint` (`lead_fingerprint`);
 
 --
 -- Indexes for table `csv_uploads`
 --
 ALTER TABLE `csv_uploads`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `content_hash` (`content_hash`);
 
 --
 -- Indexes for table `features`
@@ -1,5 +1,5 @@
 
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useRef } from "react";
 
 // Otomatisasi base URL backend Flask
 const API_BASE_URL =
@@ -8,35 +8,46 @@ const API_BASE_URL =
     ? "http://localhost:5000"
     : "");
 
+// Polling status proses: berhenti kalau progress tidak bergerak selama POLL_STALE_MS
+const POLL_INTERVAL_MS = 2000;
+const POLL_STALE_MS = 5 * 60 * 1000;
+const POLL_MAX_ERRORS = 3;
+
 const CSVClientUpload = () => {
   const [file, setFile] = useState(null);
   const [uploads, setUploads] = useState([]);
   const [selectedUpload, setSelectedUpload] = useState(null);
   const [results, setResults] = useState([]);
-  const [filteredResults, setFilteredResults] = useState([]); // Hasil yang difilter
   const [processing, setProcessing] = useState(false);
   const [uploading, setUploading] = useState(false);
   const [deleting, setDeleting] = useState(false);
   const [errorMessage, setErrorMessage] = useState("");
   const [successMessage, setSuccessMessage] = useState("");
   const [searchTerm, setSearchTerm] = useState(""); // State untuk pencarian
+  const [nextCursor, setNextCursor] = useState(null); // Cursor halaman hasil berikutnya
+  const [totalResults, setTotalResults] = useState(0);
+  const [summary, setSummary] = useState(null); // Ringkasan seluruh hasil upload (bukan hanya halaman yang dimuat)
+  const [retryUploadId, setRetryUploadId] = useState(null); // Upload yang gagal/macet saat diproses
+  const [retryForce, setRetryForce] = useState(false); // Reset paksa hanya setelah proses terdeteksi macet
 
   // Load uploads on component mount
   useEffect(() => {
     fetchUploads();
   }, []);
 
-  // Filter results ketika searchTerm atau results berubah
+  const appliedQuery = useRef(""); // Pencarian yang dipakai untuk hasil yang sedang tampil
+  const resultsRequest = useRef(0); // Abaikan response pencarian yang sudah kedaluwarsa
+
+  // Pencarian nama dijalankan di server (?q=) supaya mencakup semua hasil upload,
+  // bukan hanya halaman yang sudah dimuat
   useEffect(() => {
-    if (searchTerm.trim() === "") {
-      setFilteredResults(results);
-    } else {
-      const filtered = results.filter(item =>
-        item.client_name.toLowerCase().includes(searchTerm.toLowerCase())
-      );
-      setFilteredResults(filtered);
+    const query = searchTerm.trim();
+    if (!selectedUpload || query === appliedQuery.current) {
+      return;
     }
-  }, [searchTerm, results]);
+    const timer = setTimeout(() => viewResults(selectedUpload.id, null, query), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm, selectedUpload]);
 
   const handleFileChange = (e) => {
     const selectedFile = e.target.files[0];
@@ -111,14 +122,15 @@ const CSVClientUpload = () => {
     }
   };
 
-  const processUpload = async (uploadId) => {
+  const processUpload = async (uploadId, force = false) => {
     setProcessing(true);
     setErrorMessage("");
     setSuccessMessage("");
+    setRetryUploadId(null);
 
     try {
       const response = await fetch(
-        `${API_BASE_URL}/api/process-csv-upload/${uploadId}`,
+        `${API_BASE_URL}/api/process-csv-upload/${uploadId}${force ? "?force=1" : ""}`,
         {
           method: "POST",
           headers: {
@@ -129,21 +141,84 @@ const CSVClientUpload = () => {
 
       const result = await response.json();
       if (response.ok) {
-        setSuccessMessage(
-          `CSV processing completed. ${result.processed_rows} rows analyzed.`
-        );
+        // Processing berjalan di background, pantau progress sampai selesai
+        fetchUploads();
+        const status = await pollProcessingStatus(uploadId);
+        if (status.status === "completed") {
+          setSuccessMessage(
+            `CSV processing completed. ${status.processed_rows} rows analyzed.`
+          );
+        } else {
+          setSuccessMessage("");
+          setErrorMessage("Error processing upload");
+          setRetryUploadId(uploadId);
+          setRetryForce(false);
+        }
         fetchUploads();
       } else {
         setErrorMessage(result.error || "Error processing upload");
       }
     } catch (error) {
       console.error("Error processing upload:", error);
-      setErrorMessage("Error processing upload. Pastikan backend berjalan.");
+      setSuccessMessage("");
+      setErrorMessage(
+        error.stale
+          ? error.message
+          : "Error processing upload. Pastikan backend berjalan."
+      );
+      setRetryUploadId(uploadId);
+      // Gangguan koneksi saja belum berarti job macet: retry biasa akan ditolak (409)
+      // selama job lama masih jalan, jadi hasilnya tidak dihapus di tengah proses
+      setRetryForce(Boolean(error.stale));
+      fetchUploads();
     } finally {
       setProcessing(false);
     }
   };
 
+  const pollProcessingStatus = async (uploadId) => {
+    let lastProcessed = -1;
+    let lastProgressAt = Date.now();
+    let failures = 0;
+    for (;;) {
+      await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+      let status;
+      try {
+        const response = await fetch(
+          `${API_BASE_URL}/api/csv-upload-status/${uploadId}`
+        );
+        if (!response.ok) {
+          throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        status = await response.json();
+        failures = 0;
+      } catch (error) {
+        // Gangguan jaringan sesaat masih ditoleransi beberapa kali
+        failures += 1;
+        if (failures >= POLL_MAX_ERRORS) {
+          throw error;
+        }
+        continue;
+      }
+      setSuccessMessage(
+        `Memproses CSV... ${status.processed_rows || 0}/${status.total_rows || 0} baris (${status.progress}%)`
+      );
+      if (status.status !== "processing") {
+        return status;
+      }
+      if (status.processed_rows !== lastProcessed) {
+        lastProcessed = status.processed_rows;
+        lastProgressAt = Date.now();
+      } else if (Date.now() - lastProgressAt > POLL_STALE_MS) {
+        const error = new Error(
+          `Proses CSV tidak ada progress selama ${POLL_STALE_MS / 60000} menit.`
+        );
+        error.stale = true;
+        throw error;
+      }
+    }
+  };
+
   const deleteUpload = async (uploadId, filename) => {
     if (
       !window.confirm(
@@ -194,8 +269,8 @@ const CSVClientUpload = () => {
       // Clear results if viewing the deleted upload
       if (selectedUpload && selectedUpload.id === uploadId) {
         setResults([]);
-        setFilteredResults([]);
         setSelectedUpload(null);
+        setSummary(null);
         setSearchTerm(""); // Reset pencarian
       }
     } catch (error) {
@@ -208,14 +283,30 @@ const CSVClientUpload = () => {
     }
   };
 
-  const viewResults = async (uploadId) => {
+  const viewResults = async (uploadId, cursor = null, query = null) => {
     setErrorMessage("");
     setSuccessMessage("");
-    setSearchTerm(""); // Reset pencarian saat melihat hasil baru
+    if (query === null) {
+      // Membuka hasil upload: reset pencarian dan muat ulang ringkasan
+      query = "";
+      setSearchTerm("");
+      setSummary(null);
+      fetchSummary(uploadId);
+    }
+    appliedQuery.current = query;
+    const requestId = ++resultsRequest.current;
 
     try {
+      // Hasil diambil per halaman (keyset pagination), difilter nama di server
+      const params = new URLSearchParams();
+      if (cursor) {
+        params.set("cursor", cursor);
+      }
+      if (query) {
+        params.set("q", query);
+      }
       const response = await fetch(
-        `${API_BASE_URL}/api/csv-results/${uploadId}`
+        `${API_BASE_URL}/api/csv-results/${uploadId}?${params.toString()}`
       );
 
       if (!response.ok) {
@@ -223,8 +314,14 @@ const CSVClientUpload = () => {
       }
 
       const data = await response.json();
-      setResults(data.results);
-      setFilteredResults(data.results); // Set filtered results sama dengan results awal
+      if (requestId !== resultsRequest.current) {
+        return;
+      }
+      setResults((prev) => (cursor ? [...prev, ...data.results] : data.results));
+      setNextCursor(data.next_cursor);
+      if (!cursor) {
+        setTotalResults(data.total_results);
+      }
       setSelectedUpload(data.upload_info);
     } catch (error) {
       console.error("Error fetching results:", error);
@@ -232,6 +329,18 @@ const CSVClientUpload = () => {
     }
   };
 
+  const fetchSummary = async (uploadId) => {
+    try {
+      const response = await fetch(`${API_BASE_URL}/api/csv-summary/${uploadId}`);
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+      setSummary(await response.json());
+    } catch (error) {
+      console.error("Error fetching summary:", error);
+    }
+  };
+
   const downloadResults = async (uploadId) => {
     try {
       const response = await fetch(
@@ -274,6 +383,7 @@ const CSVClientUpload = () => {
   const clearMessages = () => {
     setErrorMessage("");
     setSuccessMessage("");
+    setRetryUploadId(null);
   };
 
   const handleSearchChange = (e) => {
@@ -292,6 +402,15 @@ const CSVClientUpload = () => {
       {errorMessage && (
         <div className="error-message">
           <span>{errorMessage}</span>
+          {retryUploadId && (
+            <button
+              onClick={() => processUpload(retryUploadId, retryForce)}
+              disabled={processing}
+              className="btn-process"
+            >
+              Coba lagi
+            </button>
+          )}
           <button onClick={clearMessages} className="close-message">
             ×
           </button>
@@ -359,7 +478,7 @@ const CSVClientUpload = () => {
                   <td>{getStatusBadge(upload.status)}</td>
                   <td>
                     <div className="action-buttons">
-                      {upload.status === "pending" && (
+                      {(upload.status === "pending" || upload.status === "failed") && (
                         <button
                           onClick={() => processUpload(upload.id)}
                           disabled={processing}
@@ -436,7 +555,7 @@ const CSVClientUpload = () => {
               <span className="search-icon">🔍</span>
             </div>
             <div className="search-info">
-              Menampilkan {filteredResults.length} dari {results.length} hasil
+              Menampilkan {results.length} dari {totalResults} hasil
               {searchTerm && (
                 <span className="search-term"> untuk "{searchTerm}"</span>
               )}
@@ -446,34 +565,23 @@ const CSVClientUpload = () => {
           <div className="results-summary">
             <div className="summary-item">
               <h4>Total Klien</h4>
-              <p>{results.length}</p>
+              <p>{summary ? summary.total_clients : "-"}</p>
             </div>
             <div className="summary-item">
               <h4>Rata-rata Skor</h4>
-              <p>
-                {Math.round(
-                  results.reduce((sum, item) => sum + item.potential_score, 0) /
-                    results.length
-                )}
-              </p>
+              <p>{summary ? Math.round(summary.avg_score) : "-"}</p>
             </div>
             <div className="summary-item">
               <h4>Prioritas Tinggi</h4>
-              <p>
-                {results.filter((item) => item.priority === "Tinggi").length}
-              </p>
+              <p>{summary ? summary.high_priority : "-"}</p>
             </div>
             <div className="summary-item">
               <h4>Prioritas Sedang</h4>
-              <p>
-                {results.filter((item) => item.priority === "Sedang").length}
-              </p>
+              <p>{summary ? summary.medium_priority : "-"}</p>
             </div>
             <div className="summary-item">
               <h4>Prioritas Rendah</h4>
-              <p>
-                {results.filter((item) => item.priority === "Rendah").length}
-              </p>
+              <p>{summary ? summary.low_priority : "-"}</p>
             </div>
           </div>
 
@@ -496,7 +604,7 @@ const CSVClientUpload = () => {
                 </tr>
               </thead>
               <tbody>
-                {filteredResults.map((result, index) => (
+                {results.map((result, index) => (
                   <tr key={result.id}>
                     <td className="rank-cell">{index + 1}</td>
                     <td>
@@ -575,7 +683,16 @@ const CSVClientUpload = () => {
               </tbody>
             </table>
 
-            {filteredResults.length === 0 && searchTerm && (
+            {nextCursor && (
+              <button
+                onClick={() => viewResults(selectedUpload.id, nextCursor, appliedQuery.current)}
+                className="btn-load-more"
+              >
+                Muat lebih banyak
+              </button>
+            )}
+
+            {results.length === 0 && searchTerm && (
               <div className="no-results">
                 <p>Tidak ditemukan klien dengan nama "{searchTerm}"</p>
                 <button onClick={clearSearch} className="btn-clear-search">
@@ -595,9 +712,9 @@ const CSVClientUpload = () => {
             <button
               onClick={() => {
                 setResults([]);
-                setFilteredResults([]);
                 setSelectedUpload(null);
                 setSearchTerm("");
+                setNextCursor(null);
               }}
               className="btn-clear"
             >
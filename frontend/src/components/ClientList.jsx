@@ -3,22 +3,35 @@ import React, { useState, useEffect } from "react";
 const ClientList = () => {
   const [clients, setClients] = useState([]);
   const [summary, setSummary] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchClients();
     fetchSummary();
   }, []);
 
-  const fetchClients = async () => {
+  // Data diambil per halaman (keyset pagination), cursor berikutnya ada di header
+  const fetchClients = async (cursor = null) => {
     try {
-      const response = await fetch("http://localhost:5000/api/clients");
+      const url = cursor
+        ? `http://localhost:5000/api/clients?cursor=${encodeURIComponent(cursor)}`
+        : "http://localhost:5000/api/clients";
+      const response = await fetch(url);
       const data = await response.json();
-      setClients(data);
+      setClients((prev) => (cursor ? [...prev, ...data] : data));
+      setNextCursor(response.headers.get("X-Next-Cursor"));
     } catch (error) {
       console.error("Error fetching clients:", error);
     }
   };
 
+  const loadMoreClients = async () => {
+    setLoadingMore(true);
+    await fetchClients(nextCursor);
+    setLoadingMore(false);
+  };
+
   const fetchSummary = async () => {
     try {
       const response = await fetch("http://localhost:5000/api/analysis");
@@ -116,6 +129,11 @@ const ClientList = () => {
             ))}
           </tbody>
         </table>
+        {nextCursor && (
+          <button onClick={loadMoreClients} disabled={loadingMore} className="btn-load-more">
+            {loadingMore ? "Memuat..." : "Muat lebih banyak"}
+          </button>
+        )}
       </div>
     </div>
   );